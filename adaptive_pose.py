@@ -0,0 +1,166 @@
+import os
+import time
+
+import numpy as np
+
+from pose_roi import PoseRoi
+from utils import landmarks_to_array
+
+# Landmarks below this visibility are ignored when measuring motion
+VISIBILITY_THRESHOLD = 0.5
+
+# Never project landmarks further than this past a keyframe (seconds)
+MAX_EXTRAPOLATION = 0.5
+
+
+class AdaptivePoseEstimator:
+    """
+    Runs full pose inference on keyframes and extrapolates landmarks in between
+
+    After every keyframe the per-landmark velocity is measured against the
+    previous keyframe. Frames in between get landmarks extrapolated along
+    that velocity instead of a pose.process call. The keyframe interval
+    adapts to the fastest visible joint: fast movement (a curl or a squat
+    transition) runs inference on every frame so rep thresholds are never
+    skipped, while a held plank drops to one inference every
+    ``max_interval`` frames.
+
+    Disabled unless ADAPTIVE_INFERENCE is set, in which case every frame is
+    a keyframe and the estimator simply wraps pose.process.
+
+    With POSE_ROI set, keyframes run on a crop around the previous frame's
+    body (see PoseRoi) and fall back to the full frame when the crop misses.
+    """
+
+    def __init__(self, pose, enabled=None, max_interval=None, slow_velocity=None, fast_velocity=None, roi=None):
+        self.pose = pose
+        if enabled is None:
+            enabled = _env_flag('ADAPTIVE_INFERENCE')
+        self.enabled = enabled
+        if roi is None and _env_flag('POSE_ROI'):
+            roi = PoseRoi()
+        self.roi = roi
+        self.max_interval = max_interval or int(os.environ.get('ADAPTIVE_MAX_INTERVAL', 5))
+        # Joint speeds in normalized image units per second
+        self.slow_velocity = slow_velocity or float(os.environ.get('ADAPTIVE_SLOW_VELOCITY', 0.05))
+        self.fast_velocity = fast_velocity or float(os.environ.get('ADAPTIVE_FAST_VELOCITY', 0.5))
+
+        self.interval = 1
+        self._since_keyframe = 0
+        self._landmarks = None
+        self._keyframe_time = None
+        self._velocity = None
+
+        self.keyframes = 0
+        self.extrapolated = 0
+        self.roi_misses = 0
+
+    def estimate(self, image, timestamp=None):
+        """
+        Landmarks for one frame
+
+        Args:
+            image: RGB frame for mediapipe
+            timestamp: Capture time in seconds (defaults to now)
+
+        Returns:
+            (33, 4) landmark array, or None if no pose is being tracked
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+
+        if (not self.enabled or self._landmarks is None or self._velocity is None
+                or self._since_keyframe + 1 >= self.interval):
+            return self._keyframe(image, timestamp)
+
+        self._since_keyframe += 1
+        self.extrapolated += 1
+
+        landmarks = self._landmarks.copy()
+        elapsed = min(timestamp - self._keyframe_time, MAX_EXTRAPOLATION)
+        landmarks[:, :3] += self._velocity * elapsed
+        return landmarks
+
+    def _detect(self, image):
+        """Run pose inference, on the body's region when ROI cropping is on"""
+        if self.roi is None:
+            return result_landmarks(self.pose.process(image))
+
+        region, box = self.roi.prepare(image, self._landmarks)
+        landmarks = result_landmarks(self.pose.process(region))
+
+        if landmarks is None and not PoseRoi.is_full_frame(box, image.shape):
+            # The person left the crop: look at the whole frame again
+            self.roi_misses += 1
+            region, box = self.roi.prepare(image)
+            landmarks = result_landmarks(self.pose.process(region))
+
+        if landmarks is None:
+            return None
+        return PoseRoi.to_frame(landmarks, box, image.shape)
+
+    def _keyframe(self, image, timestamp):
+        landmarks = self._detect(image)
+        self.keyframes += 1
+        self._since_keyframe = 0
+
+        if landmarks is None:
+            # Tracking lost: keep running inference on every frame until it is back
+            self._landmarks = None
+            self._velocity = None
+            self.interval = 1
+            return None
+
+        if self.enabled and self._landmarks is not None and timestamp > self._keyframe_time:
+            velocity = (landmarks[:, :3] - self._landmarks[:, :3]) / (timestamp - self._keyframe_time)
+            self._velocity = velocity.astype(np.float32)
+            self.interval = self._interval_for(velocity, landmarks)
+        else:
+            self._velocity = None
+            self.interval = 1
+
+        self._landmarks = landmarks
+        self._keyframe_time = timestamp
+        return landmarks
+
+    def _interval_for(self, velocity, landmarks):
+        """Map the fastest visible joint's speed to a keyframe interval"""
+        visible = landmarks[:, 3] > VISIBILITY_THRESHOLD
+        if not visible.any():
+            return 1
+
+        speed = float(np.sqrt((velocity[visible, :2] ** 2).sum(axis=1)).max())
+        if speed >= self.fast_velocity:
+            return 1
+        if speed <= self.slow_velocity:
+            return self.max_interval
+
+        fraction = (self.fast_velocity - speed) / (self.fast_velocity - self.slow_velocity)
+        return max(1, int(round(1 + fraction * (self.max_interval - 1))))
+
+    def stats(self):
+        """Return keyframe and extrapolation counters"""
+        return {
+            'enabled': self.enabled,
+            'interval': self.interval,
+            'keyframes': self.keyframes,
+            'extrapolated': self.extrapolated,
+            'roi': self.roi is not None,
+            'roi_misses': self.roi_misses
+        }
+
+
+def result_landmarks(results):
+    """
+    (33, 4) landmark array from a pose result, or None if no pose was found
+
+    Worker-process poses (see pose_workers.RemotePose) already hand back the
+    array, mediapipe itself a NormalizedLandmarkList.
+    """
+    landmarks = results.pose_landmarks
+    if landmarks is None or isinstance(landmarks, np.ndarray):
+        return landmarks
+    return landmarks_to_array(landmarks)
+
+
+def _env_flag(name):
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
@@ -1,3 +1,8 @@
+import eventlet
+# Sockets, requests and session loops run as green threads; blocking native
+# calls (camera, inference, JPEG) are offloaded to real threads via cooperative.offload
+eventlet.monkey_patch()
+
 from flask import Flask, Response, render_template, request, jsonify, send_from_directory
 from flask_socketio import SocketIO, emit
 import cv2
@@ -5,31 +10,42 @@ import os
 import json
 import pygame
 import time
-import base64
 from gtts import gTTS
 from flask_cors import CORS
-import asyncio
 import traceback
-from concurrent.futures import ThreadPoolExecutor
-import numpy as np
-import threading
 import datetime
+import uuid
 
 # Import WebRTC processing
-from rtc_video_server import process_offer
+from rtc_video_server import process_offer, run_coroutine, peer_connections
 
 # Import exercise modules
-from utils import calculate_angle
-from exercises.bicep_curl import hummer
-from exercises.front_raise import dumbbell_front_raise
-from exercises.squat import squat
-from exercises.triceps_extension import triceps_extension
-from exercises.lunges import lunges
-from exercises.shoulder_press import shoulder_press
-from exercises.plank import plank
-from exercises.lateral_raise import side_lateral_raise
-from exercises.triceps_kickback import triceps_kickback_side
-from exercises.push_ups import push_ups
+from pose_pool import get_pose_pool
+from capture import LatestFrameCapture
+from frame_ingest import ClientFrameSource
+from frame_encoder import get_frame_encoder
+from landmark_codec import LandmarkEncoder
+from quality_controller import QualityController
+from frame_pacer import FramePacer
+from mjpeg_hub import MjpegHub
+from result_cache import get_result_cache
+from session_events import get_session_events
+from session_store import get_session_registry, store_url, worker_id, worker_count
+from session_table import Session, SessionTable, SessionLimitReached
+from load_shedder import get_load_shedder, Overloaded
+from inference_scheduler import get_inference_scheduler, ScheduledPose
+from adaptive_pose import AdaptivePoseEstimator
+from exercises.bicep_curl import hummer, HUMMER
+from exercises.front_raise import dumbbell_front_raise, DUMBBELL_FRONT_RAISE
+from exercises.squat import squat, SQUAT
+from exercises.triceps_extension import triceps_extension, TRICEPS_EXTENSION
+from exercises.lunges import lunges, LUNGES
+from exercises.shoulder_press import shoulder_press, SHOULDER_PRESS
+from exercises.plank import plank, PLANK
+from exercises.lateral_raise import side_lateral_raise, SIDE_LATERAL_RAISE
+from exercises.triceps_kickback import triceps_kickback_side, TRICEPS_KICKBACK_SIDE
+from exercises.push_ups import push_ups, PUSH_UPS
+from exercises.engine import ExerciseTracker, draw_frame, render_plan
 
 app = Flask(__name__, static_folder='static')
 CORS(app)  # Enable CORS for all routes
@@ -47,11 +63,14 @@ socketio = SocketIO(
     http_compression=False,
     manage_session=False,
     websocket=True,           # Explicitly enable WebSocket transport
-    allow_upgrades=True       # Allow transport upgrades
+    allow_upgrades=True,      # Allow transport upgrades
+    # Shared queue (e.g. redis://) so emits reach clients connected to other worker processes
+    message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE')
 )
 
-# Setup for async processing
-executor = ThreadPoolExecutor()
+# Gunicorn cannot pin a client's polling requests to one worker, so with
+# several workers the browser connects over WebSocket only
+SOCKET_TRANSPORTS = ['websocket'] if worker_count() > 1 else ['polling', 'websocket']
 
 # Dummy sound class to avoid file path issues
 class DummySound:
@@ -72,8 +91,10 @@ sound = DummySound()
 # Ensure audio directory exists
 os.makedirs("audio", exist_ok=True)
 
-# Dictionary to store active sessions
-active_sessions = {}
+# Sessions this process runs, with their live objects; caps how many may run at once
+active_sessions = SessionTable()
+# Exercise, mode, transport, owner and counters of every session on every worker
+session_registry = get_session_registry()
 
 # Dictionary to store exercise functions
 exercise_map = {
@@ -89,6 +110,61 @@ exercise_map = {
     'push_ups': push_ups
 }
 
+# One shared capture/pose/encode loop per exercise for all /video_feed viewers
+mjpeg_hub = MjpegHub(lambda exercise: exercise_map[exercise](sound))
+
+# Exercise catalogue served by /api/exercises
+EXERCISES = [
+    {"id": "hummer", "name": "Bicep Curl (Hammer)"},
+    {"id": "front_raise", "name": "Dumbbell Front Raise"},
+    {"id": "squat", "name": "Squat"},
+    {"id": "triceps", "name": "Triceps Extension"},
+    {"id": "lunges", "name": "Lunges"},
+    {"id": "shoulder_press", "name": "Shoulder Press"},
+    {"id": "plank", "name": "Plank"},
+    {"id": "side_lateral_raise", "name": "Side Lateral Raise"},
+    {"id": "triceps_kickback_side", "name": "Triceps Kickback (Side View)"},
+    {"id": "push_ups", "name": "Push Ups"}
+]
+VALID_EXERCISES = frozenset(exercise['id'] for exercise in EXERCISES)
+
+# Long-poll sessions stop once nobody has polled for this many seconds
+LONG_POLL_IDLE = float(os.environ.get('LONG_POLL_IDLE', 60))
+LONG_POLL_TIMEOUT = float(os.environ.get('LONG_POLL_TIMEOUT', 25))
+# SSE streams send a comment line when nothing changed for this long
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', 15))
+# Seconds clients refused at capacity or under load are told to wait before trying again
+CAPACITY_RETRY_AFTER = int(os.environ.get('CAPACITY_RETRY_AFTER', 10))
+
+# Exercise specs run by the engine for the Socket.IO pipeline
+exercise_specs = {
+    'hummer': HUMMER,
+    'front_raise': DUMBBELL_FRONT_RAISE,
+    'squat': SQUAT,
+    'triceps': TRICEPS_EXTENSION,
+    'lunges': LUNGES,
+    'shoulder_press': SHOULDER_PRESS,
+    'plank': PLANK,
+    'side_lateral_raise': SIDE_LATERAL_RAISE,
+    'triceps_kickback_side': TRICEPS_KICKBACK_SIDE,
+    'push_ups': PUSH_UPS
+}
+
+def capacity_response(error):
+    """503 for HTTP clients turned away at session capacity or under load"""
+    response = jsonify({
+        "error": str(error),
+        "reason": error.reason,
+        "retry_after": CAPACITY_RETRY_AFTER
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(CAPACITY_RETRY_AFTER)
+    return response
+
+def outside_sessions():
+    """Sessions running outside active_sessions: WebRTC peers and MJPEG producers (which hold pose instances)"""
+    return len(peer_connections) + mjpeg_hub.producers()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -106,7 +182,7 @@ def direct_exercise(exercise):
         app.logger.error(f"Invalid exercise requested: {exercise}")
         return "Exercise not found", 404
         
-    return render_template('websocket_exercise.html', exercise_id=exercise)
+    return render_template('websocket_exercise.html', exercise_id=exercise, socket_transports=SOCKET_TRANSPORTS)
 
 
 
@@ -174,7 +250,7 @@ def websocket_exercise(exercise):
         app.logger.error(f"Invalid exercise requested: {exercise}")
         return "Exercise not found", 404
         
-    return render_template('websocket_exercise.html', exercise_id=exercise)
+    return render_template('websocket_exercise.html', exercise_id=exercise, socket_transports=SOCKET_TRANSPORTS)
 
 # For backward compatibility
 @app.route('/direct_video/<exercise>')
@@ -185,17 +261,26 @@ def direct_video(exercise):
         app.logger.error(f"Invalid exercise requested: {exercise}")
         return "Exercise not found", 404
         
-    return render_template('websocket_exercise.html', exercise_id=exercise)
+    return render_template('websocket_exercise.html', exercise_id=exercise, socket_transports=SOCKET_TRANSPORTS)
 
 @app.route('/api/rtc_offer', methods=['POST'])
 def rtc_offer():
     try:
         data = request.json
-        app.logger.info(f"Received WebRTC offer for exercise: {data.get('exercise', 'unknown')}")
+        exercise = data.get('exercise', 'unknown')
+        app.logger.info(f"Received WebRTC offer for exercise: {exercise}")
+        
+        if exercise not in exercise_specs:
+            return jsonify({"error": f"Invalid exercise: {exercise}"}), 404
         
-        # Use ThreadPoolExecutor to handle async processing
-        future = executor.submit(asyncio.run, process_offer(data))
-        response = future.result()
+        # WebRTC peers run their own inference and share the session capacity
+        if get_load_shedder().refusing():
+            return capacity_response(Overloaded("Server is under heavy load, try again shortly"))
+        if not active_sessions.has_room(others=outside_sessions()):
+            return capacity_response(SessionLimitReached(f"Server is at capacity ({active_sessions.capacity} sessions)"))
+        
+        # Peer connections live on the long-running WebRTC loop, not this request
+        response = run_coroutine(process_offer(data, exercise_specs[exercise]), timeout=15)
         
         return jsonify(response)
     except Exception as e:
@@ -206,19 +291,7 @@ def rtc_offer():
 @app.route('/api/exercises', methods=['GET'])
 def get_exercises():
     try:
-        exercises = [
-            {"id": "hummer", "name": "Bicep Curl (Hammer)"},
-            {"id": "front_raise", "name": "Dumbbell Front Raise"},
-            {"id": "squat", "name": "Squat"},
-            {"id": "triceps", "name": "Triceps Extension"},
-            {"id": "lunges", "name": "Lunges"},
-            {"id": "shoulder_press", "name": "Shoulder Press"},
-            {"id": "plank", "name": "Plank"},
-            {"id": "side_lateral_raise", "name": "Side Lateral Raise"},
-            {"id": "triceps_kickback_side", "name": "Triceps Kickback (Side View)"},
-            {"id": "push_ups", "name": "Push Ups"}
-        ]
-        return jsonify(exercises)
+        return jsonify(EXERCISES)
     except Exception as e:
         app.logger.error(f"Error in get_exercises: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -248,9 +321,16 @@ def video_feed(exercise):
             # Add debug logging
             print(f"Starting video feed for exercise: {exercise}")
             
+            # A viewer that starts a producer takes a pose instance like a session
+            if not mjpeg_hub.running(exercise):
+                if get_load_shedder().refusing():
+                    return capacity_response(Overloaded("Server is under heavy load, try again shortly"))
+                if not active_sessions.has_room(others=outside_sessions()):
+                    return capacity_response(SessionLimitReached(f"Server is at capacity ({active_sessions.capacity} sessions)"))
+            
             # Add cache control headers
             return Response(
-                exercise_map[exercise](sound), 
+                mjpeg_hub.subscribe(exercise).frames(), 
                 mimetype='multipart/x-mixed-replace; boundary=frame',
                 headers={
                     'Cache-Control': 'no-cache, no-store, must-revalidate',
@@ -275,14 +355,8 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print(f"Client disconnected: {request.sid}")
-    # Clean up any active session on disconnect
-    if request.sid in active_sessions:
-        session_data = active_sessions[request.sid]
-        if 'stop_event' in session_data:
-            session_data['stop_event'].set()
-        if 'cap' in session_data and session_data['cap'] is not None:
-            session_data['cap'].release()
-        del active_sessions[request.sid]
+    # Stop any active session, its frame loop removes it once finished
+    active_sessions.stop(request.sid)
 
 @socketio.on('start_exercise')
 def handle_start_exercise(data):
@@ -294,35 +368,52 @@ def handle_start_exercise(data):
             emit('error', {'message': f'Invalid exercise: {exercise_id}'})
             return
         
-        # Stop any currently active session
-        if request.sid in active_sessions:
-            session_data = active_sessions[request.sid]
-            if 'stop_event' in session_data:
-                session_data['stop_event'].set()
-            if 'cap' in session_data and session_data['cap'] is not None:
-                session_data['cap'].release()
-        
-        # Create a stop event to allow safe termination
-        stop_event = threading.Event()
-        
-        # Store session data
-        active_sessions[request.sid] = {
-            'exercise_id': exercise_id,
-            'stop_event': stop_event,
-            'cap': None,
-            'left_counter': 0,
-            'right_counter': 0
-        }
+        # 'client' sessions get their frames uploaded from the browser camera
+        source = data.get('source', 'server')
+        # 'landmarks' sessions get pose data only and draw the overlay themselves
+        mode = data.get('mode', 'video')
+        if mode not in ('video', 'landmarks'):
+            emit('error', {'message': f'Invalid mode: {mode}'})
+            return
+        # Under load new sessions start on the lower quality ladder, or get pose data only
+        try:
+            mode, levels = get_load_shedder().plan(mode, source)
+        except Overloaded as e:
+            emit('exercise_refused', refusal(exercise_id, e))
+            return
+        # Clients that acknowledge rendered frames get quality adapted to their link
+        quality = QualityController(levels=levels) if data.get('acks') and mode == 'video' else None
+        cap = None
+        if source == 'client':
+            sid = request.sid
+            # Per-frame traffic goes straight to the client's socket, which this worker holds
+            cap = ClientFrameSource(on_ack=lambda ack: socketio.emit('frame_ack', ack, room=sid, ignore_queue=True))
+        
+        # Admit the session (replacing a running one), or turn it away at capacity
+        session = Session(request.sid, exercise_id, source=source, mode=mode, cap=cap, quality=quality,
+                          output=levels[0] if levels and quality is None else None)
+        try:
+            active_sessions.admit(session, others=outside_sessions())
+        except SessionLimitReached as e:
+            if cap is not None:
+                cap.release()
+            emit('exercise_refused', refusal(exercise_id, e))
+            return
+        session_registry.add(request.sid, exercise_id=exercise_id, source=source, mode=mode,
+                             transport='socket.io', left_counter=0, right_counter=0)
         
-        # Start a thread to process the exercise
-        exercise_thread = threading.Thread(
-            target=process_exercise_frames,
-            args=(request.sid, exercise_id, stop_event)
-        )
-        exercise_thread.daemon = True
-        exercise_thread.start()
+        # Process the exercise on a green thread alongside the socket I/O
+        socketio.start_background_task(process_exercise_frames, session)
         
-        emit('exercise_started', {'exercise_id': exercise_id})
+        started = {'exercise_id': exercise_id, 'source': source, 'mode': mode}
+        if cap is not None:
+            started['credits'] = cap.credits()
+        if mode == 'landmarks':
+            started['render_plan'] = render_plan(ExerciseTracker(exercise_specs[exercise_id]))
+        if levels is not None:
+            # Started while shedding load, at this output or below
+            started['output'] = levels[0]
+        emit('exercise_started', started)
         
     except Exception as e:
         print(f"Error starting exercise: {str(e)}")
@@ -334,19 +425,56 @@ def handle_stop_exercise():
     try:
         print(f"Stopping exercise for session {request.sid}")
         
-        if request.sid in active_sessions:
-            session_data = active_sessions[request.sid]
-            if 'stop_event' in session_data:
-                session_data['stop_event'].set()
-            if 'cap' in session_data and session_data['cap'] is not None:
-                session_data['cap'].release()
-            
+        active_sessions.stop(request.sid)
         emit('exercise_stopped')
         
     except Exception as e:
         print(f"Error stopping exercise: {str(e)}")
         emit('error', {'message': f'Error stopping exercise: {str(e)}'})
 
+@socketio.on('ingest_frame')
+def handle_ingest_frame(meta, frame):
+    """
+    Accept a camera frame uploaded by the browser
+    
+    Args:
+        meta: {'seq': sequence number, 'captured_at': client timestamp in ms}
+        frame: JPEG bytes
+    """
+    session = active_sessions.get(request.sid)
+    source = session.cap if session is not None else None
+    valid = isinstance(meta, dict)
+    if not valid:
+        meta = {}
+    if not isinstance(source, ClientFrameSource):
+        emit('frame_ack', {'seq': meta.get('seq'), 'status': 'rejected', 'credits': 0})
+        return
+    
+    try:
+        seq = int(meta.get('seq', 0))
+    except (TypeError, ValueError):
+        valid = False
+    if not valid or not isinstance(frame, (bytes, bytearray)):
+        # Malformed upload, the client keeps its credit
+        emit('frame_ack', {'seq': meta.get('seq'), 'status': 'rejected', 'credits': source.credits()})
+        return
+    
+    source.push(seq, meta.get('captured_at'), frame)
+
+@socketio.on('frame_rendered')
+def handle_frame_rendered(data):
+    """Client acknowledgement of a displayed exercise_frame, feeds the quality controller"""
+    session = active_sessions.get(request.sid)
+    quality = session.quality if session is not None else None
+    if quality is None or not isinstance(data, dict) or data.get('frame_id') is None:
+        return
+    try:
+        frame_id = int(data['frame_id'])
+    except (TypeError, ValueError):
+        # Malformed ack, ignored
+        return
+    quality.on_ack(frame_id)
+
 @socketio.on('get_exercises')
 def handle_get_exercises():
     """Return list of exercises when requested via Socket.IO"""
@@ -357,20 +485,51 @@ def handle_get_exercises():
         print(f"Error getting exercises: {str(e)}")
         emit('error', {'message': f'Error getting exercises: {str(e)}'})
 
-def process_exercise_frames(session_id, exercise_id, stop_event):
+def refusal(exercise_id, error):
+    """exercise_refused payload for a session turned away at capacity or under load"""
+    return {'exercise_id': exercise_id, 'reason': error.reason, 'message': str(error),
+            'retry_after': CAPACITY_RETRY_AFTER}
+
+def emit_exercise_frame(session, frame_future, meta):
+    """
+    Send one processed frame and its exercise state to a session
+    
+    The JPEG goes out as a binary attachment next to a small metadata
+    header, so the browser can render it from a Blob without base64.
+    
+    Args:
+        session: Session the frame belongs to
+        frame_future: Future resolving to the JPEG bytes
+        meta: Counters and feedback for the frame
+    """
+    jpeg = frame_future.result()
+    if jpeg is None:
+        return
+    if session.quality is not None:
+        # The client echoes this back once the frame is on screen
+        meta['frame_id'] = session.quality.on_sent()
+    # The worker running a session holds its socket, keep frames off the message queue
+    socketio.emit('exercise_frame', (meta, jpeg), room=session.session_id, ignore_queue=True)
+
+def process_exercise_frames(session):
     """
     Process exercise frames and send them via WebSocket
     
     Args:
-        session_id: WebSocket session ID
-        exercise_id: ID of the exercise to track
-        stop_event: Event to signal when to stop processing
+        session: Session admitted to active_sessions; its stop_event ends the loop
     """
+    session_id, exercise_id, stop_event = session.session_id, session.exercise_id, session.stop_event
     try:
+        if not active_sessions.start(session):
+            # Stopped or replaced before the loop got to run
+            return
         print(f"Processing exercise frames for {exercise_id}, session {session_id}")
         
-        # Initialize video capture
-        cap = cv2.VideoCapture(0)
+        # Browser uploads for client sessions, otherwise the local camera on
+        # its own thread, keeping only the newest frame
+        cap = session.cap
+        if cap is None:
+            cap = LatestFrameCapture(0)
         
         if not cap.isOpened():
             print("Failed to open camera")
@@ -378,135 +537,121 @@ def process_exercise_frames(session_id, exercise_id, stop_event):
             return
         
         # Update session data
-        active_sessions[session_id]['cap'] = cap
+        session.cap = cap
+        
+        # Inference runs on the shared scheduler, on this session's own pose instance
+        scheduler = get_inference_scheduler()
+        # Full inference on keyframes only when ADAPTIVE_INFERENCE is enabled
+        estimator = AdaptivePoseEstimator(ScheduledPose(scheduler, session_id))
+        session.estimator = estimator
         
-        # Initial variables
-        left_counter = 0
-        right_counter = 0
-        left_state = None
-        right_state = None
+        # Rep counting and form rules for this exercise
+        tracker = ExerciseTracker(exercise_specs[exercise_id])
+        result = None
+        landmarks_only = session.mode == 'landmarks'
+        landmark_encoder = LandmarkEncoder() if landmarks_only else None
+        # Resolution, JPEG quality and fps for clients that acknowledge frames
+        quality = session.quality
+        # Frame deadlines at FRAME_INTERVAL_MS, or the quality controller's fps
+        pacer = FramePacer()
+        if session.output is not None:
+            pacer.set_fps(session.output['fps'])
+        session.pacer = pacer
+        # HTTP long-poll sessions have no disconnect event, they end when polling stops
+        results = get_result_cache()
+        published = None
+        long_poll = session.transport == 'long-poll'
+        # Rep, stage and feedback changes for SSE displays
+        events = get_session_events()
+        events.open(session_id)
+        
+        # The previous frame's payload, emitted once its JPEG is ready
+        encoder = get_frame_encoder()
+        pending = None
         
         while not stop_event.is_set():
-            ret, frame = cap.read()
+            # Wait briefly while a frame is still in the encode pipeline
+            ret, frame = cap.read(timeout=0.05 if pending is not None else 1.0)
             if not ret:
+                if pending is not None and not stop_event.is_set():
+                    # No next frame to overlap with, send the encoded one now
+                    emit_exercise_frame(session, *pending)
+                    pending = None
+                if cap.isOpened() and not stop_event.is_set():
+                    # Nothing uploaded yet, keep waiting
+                    continue
                 print("Failed to capture frame")
                 break
             
             # Flip the frame horizontally
-            frame = cv2.flip(frame, 1)
+            if tracker.spec.flip:
+                frame = cv2.flip(frame, 1)
             
             # Convert to RGB for mediapipe
             image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(image)
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            landmarks = estimator.estimate(image)
+            image = frame
             
-            # Exercise variables
-            form_feedback = ""
+            # Frame N was encoding on the pool while frame N+1 ran inference
+            if pending is not None:
+                emit_exercise_frame(session, *pending)
+                pending = None
             
-            if results.pose_landmarks:
-                landmarks = results.pose_landmarks.landmark
-                
-                # Draw the pose landmarks
-                mp_drawing.draw_landmarks(
-                    image, 
-                    results.pose_landmarks, 
-                    mp_pose.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=4),
-                    mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
-                )
-                
-                # Define arm landmarks for exercise tracking
-                arm_sides = {
-                    'left': {
-                        'shoulder': mp_pose.PoseLandmark.LEFT_SHOULDER,
-                        'elbow': mp_pose.PoseLandmark.LEFT_ELBOW,
-                        'wrist': mp_pose.PoseLandmark.LEFT_WRIST,
-                        'hip': mp_pose.PoseLandmark.LEFT_HIP
-                    },
-                    'right': {
-                        'shoulder': mp_pose.PoseLandmark.RIGHT_SHOULDER,
-                        'elbow': mp_pose.PoseLandmark.RIGHT_ELBOW,
-                        'wrist': mp_pose.PoseLandmark.RIGHT_WRIST,
-                        'hip': mp_pose.PoseLandmark.RIGHT_HIP
-                    }
-                }
-                
-                # Track angles and exercise state
-                for side, joints in arm_sides.items():
-                    shoulder = [
-                        landmarks[joints['shoulder'].value].x,
-                        landmarks[joints['shoulder'].value].y,
-                    ]
-                    elbow = [
-                        landmarks[joints['elbow'].value].x,
-                        landmarks[joints['elbow'].value].y,
-                    ]
-                    wrist = [
-                        landmarks[joints['wrist'].value].x,
-                        landmarks[joints['wrist'].value].y,
-                    ]
-                    
-                    # Calculate elbow angle
-                    elbow_angle = calculate_angle(shoulder, elbow, wrist)
-                    
-                    # Display angle on frame
-                    cv2.putText(
-                        image,
-                        f'{int(elbow_angle)}',
-                        tuple(np.multiply(elbow, [image.shape[1], image.shape[0]]).astype(int)),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5,
-                        (255, 255, 255),
-                        2,
-                        cv2.LINE_AA
-                    )
-                    
-                    # Exercise specific logic - using hammer curl as an example
-                    if exercise_id == 'hummer':
-                        if side == 'left':
-                            if elbow_angle > 160:
-                                left_state = 'down'
-                            if elbow_angle < 30 and left_state == 'down':
-                                left_state = 'up'
-                                left_counter += 1
-                                print(f'Left Counter: {left_counter}')
-                                form_feedback = "جيد! استمر"
-                        
-                        if side == 'right':
-                            if elbow_angle > 160:
-                                right_state = 'down'
-                            if elbow_angle < 30 and right_state == 'down':
-                                right_state = 'up'
-                                right_counter += 1
-                                print(f'Right Counter: {right_counter}')
-                                form_feedback = "ممتاز! استمر"
-                    
-                    # (Add more exercise-specific logic here for other exercises)
-                
-                # Display counters on frame
-                cv2.putText(image, f'Left: {left_counter}', (10, 50), 
-                         cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2, cv2.LINE_AA)
-                cv2.putText(image, f'Right: {right_counter}', (10, 100), 
-                         cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2, cv2.LINE_AA)
+            # Frames the client has no room for, or no client draws at all, are tracked but never drawn or encoded
+            render = session.mode == 'video' and (quality is None or quality.ready())
+            
+            if landmarks is not None:
+                result = tracker.update(landmarks, image.shape)
+                events.update(session_id, result)
+                if render:
+                    draw_frame(image, tracker, landmarks, result)
                 
                 # Update session counters
-                active_sessions[session_id]['left_counter'] = left_counter
-                active_sessions[session_id]['right_counter'] = right_counter
+                left_counter = result.counters.get('left', result.counters.get('reps', 0))
+                right_counter = result.counters.get('right', 0)
+                if (left_counter, right_counter) != (session.left_counter, session.right_counter):
+                    session.left_counter, session.right_counter = left_counter, right_counter
+                    session_registry.update(session_id, left_counter=left_counter, right_counter=right_counter)
                 
-            # Convert frame to base64 for WebSocket transmission
-            ret, buffer = cv2.imencode('.jpg', image)
-            frame_data = base64.b64encode(buffer).decode('utf-8')
+            meta = {
+                'left_counter': session.left_counter,
+                'right_counter': session.right_counter,
+                'feedback': result.feedback if result else "",
+                'exercise': result.to_dict() if result else None
+            }
+            if isinstance(cap, ClientFrameSource):
+                # Echo the upload's sequence number and capture time for latency tracking
+                meta['seq'], meta['captured_at'] = cap.current()
+                cap.complete()
+            
+            # Latest state for long-poll readers, a new version only when counters, stages or feedback change
+            state = (session.left_counter, session.right_counter,
+                     result.stages if result else None, result.feedback_key if result else None)
+            if state != published:
+                results.publish(session_id, meta)
+                published = state
+            results.touch(session_id)
+            session_registry.touch(session_id)
+            if long_poll and results.idle(session_id) > LONG_POLL_IDLE:
+                print(f"Long-poll session {session_id} idle, stopping")
+                break
             
-            # Send frame and data
-            socketio.emit('exercise_frame', {
-                'frame': frame_data,
-                'left_counter': left_counter,
-                'right_counter': right_counter,
-                'feedback': form_feedback
-            }, room=session_id)
+            if landmarks_only:
+                # Pose data only as a binary delta packet, the client draws over its own preview
+                packet = landmark_encoder.encode(landmarks)
+                socketio.emit('exercise_landmarks', (meta, packet), room=session_id, ignore_queue=True)
+            elif render:
+                # JPEG encode for WebSocket transmission, off this thread
+                settings = quality.settings() if quality is not None else (session.output or {})
+                pending = (encoder.submit(image, quality=settings.get('quality'), scale=settings.get('scale')), meta)
             
-            # Short delay to reduce CPU usage
-            time.sleep(0.03)  # ~30 fps
+            # Sleep only for what is left of this frame's interval
+            if quality is not None:
+                pacer.set_fps(quality.settings()['fps'])
+            pacer.wait()
+        
+        if pending is not None and not stop_event.is_set():
+            emit_exercise_frame(session, *pending)
         
         # Clean up camera when done
         if cap.isOpened():
@@ -520,10 +665,50 @@ def process_exercise_frames(session_id, exercise_id, stop_event):
         socketio.emit('error', {'message': f'Error processing exercise: {str(e)}'}, room=session_id)
         
         # Cleanup
-        if session_id in active_sessions:
-            session_data = active_sessions[session_id]
-            if 'cap' in session_data and session_data['cap'] is not None:
-                session_data['cap'].release()
+        if session.cap is not None:
+            session.cap.release()
+    finally:
+        # A restarted exercise reuses the session id, leave its shared state alone
+        if active_sessions.finish(session):
+            # Drop any queued frames and hand the pose instance back to the pool
+            get_inference_scheduler().unregister(session_id)
+            get_result_cache().discard(session_id)
+            get_session_events().close(session_id)
+            session_registry.remove(session_id)
+
+@app.route('/api/inference-stats')
+def inference_stats():
+    """Queue depth, per-session wait times, pose pool usage, capture/ingest drops, output quality, pacing, MJPEG viewers, session capacity and load shedding"""
+    return jsonify({
+        'scheduler': get_inference_scheduler().stats(),
+        'pose_pool': get_pose_pool().stats(),
+        'capture': {
+            session.session_id: session.cap.stats()
+            for session in active_sessions.sessions()
+            if isinstance(session.cap, (LatestFrameCapture, ClientFrameSource))
+        },
+        'adaptive_inference': {
+            session.session_id: session.estimator.stats()
+            for session in active_sessions.sessions()
+            if session.estimator is not None
+        },
+        'quality': {
+            session.session_id: session.quality.stats()
+            for session in active_sessions.sessions()
+            if session.quality is not None
+        },
+        'pacing': {
+            session.session_id: session.pacer.stats()
+            for session in active_sessions.sessions()
+            if session.pacer is not None
+        },
+        'mjpeg': mjpeg_hub.stats(),
+        'worker': worker_id(),
+        'admission': active_sessions.stats(),
+        'load_shedding': get_load_shedder().stats(),
+        'sessions': session_registry.sessions(),
+        'timestamp': datetime.datetime.now().isoformat()
+    })
 
 @app.route('/socket-health')
 def socket_health():
@@ -547,37 +732,148 @@ def socket_diagnostic():
         'status': 'online',
         'socketio_version': socketio.__version__,
         'socketio_config': socketio_config,
+        'pose_pool': get_pose_pool().stats(),
+        'capture': {
+            session.session_id: session.cap.stats()
+            for session in active_sessions.sessions()
+            if isinstance(session.cap, (LatestFrameCapture, ClientFrameSource))
+        },
+        'adaptive_inference': {
+            session.session_id: session.estimator.stats()
+            for session in active_sessions.sessions()
+            if session.estimator is not None
+        },
+        'quality': {
+            session.session_id: session.quality.stats()
+            for session in active_sessions.sessions()
+            if session.quality is not None
+        },
+        'pacing': {
+            session.session_id: session.pacer.stats()
+            for session in active_sessions.sessions()
+            if session.pacer is not None
+        },
+        'worker': worker_id(),
+        'admission': active_sessions.stats(),
+        'load_shedding': get_load_shedder().stats(),
+        'sessions': session_registry.sessions(),
         'timestamp': datetime.datetime.now().isoformat(),
         'environment': os.environ.get('GAE_ENV', 'not-on-app-engine')
     }
 
+@app.route('/api/long-poll/<exercise_id>', methods=['POST'])
+def start_long_poll(exercise_id):
+    """Start a server-camera session for clients that can only use plain HTTP"""
+    if exercise_id not in VALID_EXERCISES:
+        return jsonify({"error": "Invalid exercise ID"}), 400
+    
+    session_id = f"http-{uuid.uuid4().hex}"
+    try:
+        # Plain HTTP clients only read counters and feedback, nothing is rendered for them
+        mode, levels = get_load_shedder().plan('counters', 'server')
+        session = Session(session_id, exercise_id, mode=mode, transport='long-poll',
+                          output=levels[0] if levels else None)
+        active_sessions.admit(session, others=outside_sessions())
+    except SessionLimitReached as e:
+        return capacity_response(e)
+    session_registry.add(session_id, exercise_id=exercise_id, source='server', mode=mode,
+                         transport='long-poll', left_counter=0, right_counter=0)
+    get_result_cache().reserve(session_id)
+    
+    socketio.start_background_task(process_exercise_frames, session)
+    
+    return jsonify({'session_id': session_id, 'exercise_id': exercise_id, 'version': 0})
+
 @app.route('/api/long-poll/<exercise_id>', methods=['GET'])
 def long_poll_exercise(exercise_id):
-    """Fallback HTTP long polling endpoint for environments where WebSockets don't work"""
+    """
+    Fallback HTTP long polling endpoint for environments where WebSockets don't work
+    
+    Query parameters:
+        session: Session id from POST /api/long-poll/<exercise_id> (or a Socket.IO sid)
+        since: Version the client already has; If-None-Match works the same way
+        wait: Seconds to block for a newer version (0 answers 304 straight away)
+    
+    Returns the latest counters and feedback with the version as its ETag,
+    or 304 if nothing newer was published before the wait ran out.
+    """
     try:
-        # Simple validation
-        if not exercise_id or exercise_id not in [exercise['id'] for exercise in get_exercises().json]:
+        if exercise_id not in VALID_EXERCISES:
             return jsonify({"error": "Invalid exercise ID"}), 400
-            
-        # Generate a frame
-        frame_data = generate_exercise_frame(exercise_id)
         
-        return jsonify(frame_data)
+        session_id = request.args.get('session')
+        if not session_id:
+            return jsonify({"error": "Missing session, start one with POST first"}), 400
+        
+        since = request.args.get('since', type=int)
+        if since is None and request.if_none_match:
+            tags = [tag for tag in request.if_none_match.as_set() if tag.isdigit()]
+            since = int(tags[0]) if tags else 0
+        wait = min(request.args.get('wait', LONG_POLL_TIMEOUT, type=float), LONG_POLL_TIMEOUT)
+        
+        entry = get_result_cache().wait(session_id, since or 0, wait)
+        if entry is None:
+            return jsonify({"error": "Session not found or finished"}), 404
+        
+        version, data = entry
+        if since is not None and version <= since:
+            response = Response(status=304)
+        else:
+            response = jsonify({'version': version, 'result': data})
+        response.set_etag(str(version))
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         print(f"Error in long polling: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-def generate_exercise_frame(exercise_id):
-    """Generate a single exercise frame for long polling"""
-    # This is a simplified version - in a real app, you'd use the same
-    # logic as in your WebSocket code to generate a frame
-    return {
-        "frame": None,  # No frame in test mode
-        "left_counter": 0,
-        "right_counter": 0, 
-        "feedback": "HTTP polling fallback active",
-        "timestamp": datetime.datetime.now().isoformat()
-    }
+def sse_message(event, data, event_id=None):
+    """Format one Server-Sent Events message"""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@app.route('/api/events/<session_id>')
+def session_event_stream(session_id):
+    """
+    Server-Sent Events feed of a session's rep counts, stages and feedback
+    
+    Sends a 'snapshot' of the current state first, then 'rep', 'stage' and
+    'feedback' events as they change, coalesced per burst. Reconnecting
+    clients pass Last-Event-ID and only get what they missed (or a fresh
+    snapshot if the missed events are no longer retained). An 'end' event
+    closes the stream when the session stops.
+    """
+    events = get_session_events()
+    current = events.current(session_id)
+    if current is None:
+        return jsonify({"error": "Session not found or finished"}), 404
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    
+    def stream():
+        after = last_event_id
+        if after is None:
+            after, snapshot = current
+            yield sse_message('snapshot', snapshot, after)
+        while True:
+            batch = events.read(session_id, after, SSE_HEARTBEAT)
+            if batch is None:
+                yield sse_message('end', {})
+                return
+            changes, snapshot, last_id = batch
+            if snapshot is not None:
+                yield sse_message('snapshot', snapshot, last_id)
+            elif not changes:
+                yield ": keep-alive\n\n"
+            for event_id, event, data in changes:
+                yield sse_message(event, data, event_id)
+            after = last_id
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/api/socketio-config')
 def socketio_config():
@@ -589,6 +885,12 @@ def socketio_config():
         "ping_timeout": socketio.ping_timeout if hasattr(socketio, 'ping_timeout') else "Not set",
         "ping_interval": socketio.ping_interval if hasattr(socketio, 'ping_interval') else "Not set",
         "handlers": list(socketio.handlers.keys()) if hasattr(socketio, 'handlers') else [],
+        "transports": SOCKET_TRANSPORTS,
+        "workers": worker_count(),
+        "worker": worker_id(),
+        # Scheme only, the URLs may carry credentials
+        "message_queue": (os.environ.get('SOCKETIO_MESSAGE_QUEUE') or 'none').split(':')[0],
+        "session_store": (store_url() or 'memory').split(':')[0],
         "environment": {
             "GAE_ENV": os.environ.get('GAE_ENV', 'not-set'),
             "PORT": os.environ.get('PORT', 'not-set'),
@@ -617,20 +919,10 @@ def add_cors_headers(response):
     return response
 
 if __name__ == '__main__':
-    # Initialize mediapipe
+    # Build the pose pool up front so the first session doesn't pay for it
     try:
-        import mediapipe as mp
-        print(f"Mediapipe loaded successfully")
-        
-        # Initialize pose
-        mp_drawing = mp.solutions.drawing_utils
-        mp_pose = mp.solutions.pose
-        pose = mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-            model_complexity=1  # Medium complexity for balance between performance and accuracy
-        )
-        print("Pose model initialized successfully")
+        get_pose_pool()
+        print("Pose model pool initialized successfully")
     except Exception as e:
         print(f"Error initializing libraries: {e}")
     
@@ -0,0 +1,67 @@
+"""
+Microbenchmark for the joint angle helpers in utils.py
+
+Compares the original per-angle NumPy implementation against the scalar
+calculate_angle and the batched calculate_angles kernel.
+
+Usage:
+    python benchmarks/angle_kernel.py [angles_per_frame]
+"""
+import os
+import sys
+import math
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import calculate_angle, calculate_angles
+
+
+def legacy_calculate_angle(a, b, c):
+    """The original implementation: three arrays, two norms and a dot product per angle"""
+    a = np.array(a)
+    b = np.array(b)
+    c = np.array(c)
+
+    ab = a - b
+    bc = c - b
+
+    cosine_angle = np.clip(np.dot(ab, bc) / (np.linalg.norm(ab) * np.linalg.norm(bc)), -1.0, 1.0)
+    return math.degrees(np.arccos(cosine_angle))
+
+
+def main():
+    angles_per_frame = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    frames = 2000
+
+    rng = np.random.default_rng(0)
+    triplets = rng.random((angles_per_frame, 3, 2))
+    points = triplets.tolist()
+
+    # Sanity check the kernels agree before timing them
+    expected = [legacy_calculate_angle(*p) for p in points]
+    assert np.allclose(expected, [calculate_angle(*p) for p in points])
+    assert np.allclose(expected, calculate_angles(triplets))
+
+    timings = {
+        'legacy calculate_angle': timeit.timeit(
+            lambda: [legacy_calculate_angle(*p) for p in points], number=frames),
+        'calculate_angle': timeit.timeit(
+            lambda: [calculate_angle(*p) for p in points], number=frames),
+        'calculate_angles (lists)': timeit.timeit(
+            lambda: calculate_angles(points), number=frames),
+        'calculate_angles (ndarray)': timeit.timeit(
+            lambda: calculate_angles(triplets), number=frames),
+    }
+
+    print(f"{angles_per_frame} angles per frame, {frames} frames")
+    baseline = timings['legacy calculate_angle']
+    for name, seconds in timings.items():
+        per_frame_us = seconds / frames * 1e6
+        print(f"  {name:<28} {per_frame_us:8.1f} us/frame  ({baseline / seconds:5.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Payload size and round-trip check for the landmark wire format
+
+Streams a synthetic curl (one arm moving, the rest of the body still with
+detector jitter) through LandmarkEncoder/LandmarkDecoder, checks every
+decoded frame stays within the quantization + delta threshold bound, and
+compares packet sizes against the JSON list the landmark mode used to send.
+
+Usage:
+    python benchmarks/landmark_codec.py [frames]
+"""
+import os
+import sys
+import json
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from landmark_codec import (LandmarkEncoder, LandmarkDecoder, COORD_SCALE,
+                            VISIBILITY_SCALE)
+
+
+def synthetic_curl(frames, rng):
+    """Landmarks for a slow curl of the left forearm with small per-frame jitter"""
+    base = np.column_stack([rng.uniform(0.3, 0.7, (33, 2)), rng.uniform(-0.3, 0.3, 33), rng.uniform(0.6, 1.0, 33)])
+    sequence = np.repeat(base[None], frames, axis=0)
+    phase = np.sin(np.linspace(0, 6 * np.pi, frames))
+    for index in (15, 17, 19, 21):  # left wrist and hand
+        sequence[:, index, 0] += 0.08 * phase
+        sequence[:, index, 1] -= 0.15 * phase
+    sequence[:, 13, 1] -= 0.02 * phase  # left elbow drifts a little
+    sequence[:, :, :3] += rng.normal(0, 0.0005, sequence[:, :, :3].shape)
+    return sequence.astype(np.float32)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 900
+    rng = np.random.default_rng(0)
+    sequence = synthetic_curl(frames, rng)
+
+    encoder = LandmarkEncoder()
+    decoder = LandmarkDecoder()
+    coord_bound = (encoder.threshold + 0.5) / COORD_SCALE + 1e-6
+    visibility_bound = (encoder.visibility_threshold + 0.5) / VISIBILITY_SCALE + 1e-6
+
+    binary_bytes = json_bytes = 0
+    max_coord_error = max_visibility_error = 0.0
+    for index, landmarks in enumerate(sequence):
+        if index == frames // 2:
+            # A frame with nobody in view resets the stream to a keyframe
+            assert decoder.decode(encoder.encode(None)) is None
+        packet = encoder.encode(landmarks)
+        decoded = decoder.decode(packet)
+
+        error = np.abs(decoded - landmarks)
+        max_coord_error = max(max_coord_error, float(error[:, :3].max()))
+        max_visibility_error = max(max_visibility_error, float(error[:, 3].max()))
+
+        binary_bytes += len(packet)
+        json_bytes += len(json.dumps(np.round(landmarks, 4).tolist()))
+
+    assert max_coord_error <= coord_bound, (max_coord_error, coord_bound)
+    assert max_visibility_error <= visibility_bound, (max_visibility_error, visibility_bound)
+
+    # A lost packet must not corrupt the pose: deltas are refused until the next keyframe
+    encoder, decoder = LandmarkEncoder(), LandmarkDecoder()
+    decoder.decode(encoder.encode(sequence[0]))
+    encoder.encode(sequence[1])
+    assert decoder.decode(encoder.encode(sequence[2])) is None
+
+    print(f"{frames} frames, keyframe every {LandmarkEncoder().keyframe_interval}")
+    print(f"  max error: coordinates {max_coord_error:.5f} (bound {coord_bound:.5f}), "
+          f"visibility {max_visibility_error:.4f} (bound {visibility_bound:.4f})")
+    print(f"  JSON    {json_bytes / frames:7.1f} bytes/frame")
+    print(f"  binary  {binary_bytes / frames:7.1f} bytes/frame  ({json_bytes / binary_bytes:5.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import time
+import threading
+
+import cv2
+
+from cooperative import native_loop, offload
+
+
+class LatestFrameCapture:
+    """
+    Camera reader running on its own thread with a single-slot frame buffer
+
+    The reader thread drains the camera as fast as it delivers frames and
+    keeps only the newest one, so a slow consumer always gets the freshest
+    frame instead of working through OpenCV's backlog of stale ones. Frames
+    overwritten before anyone read them are counted as dropped.
+
+    Mirrors the parts of cv2.VideoCapture the exercise loops use
+    (isOpened, read, release) so it can be swapped in directly.
+    """
+
+    def __init__(self, source=0, capture=None):
+        self._cap = capture if capture is not None else cv2.VideoCapture(source)
+        # Ask the backend not to queue frames behind our back
+        self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self._cv = threading.Condition()
+        self._frame = None
+        self._frame_time = 0.0
+        self._seq = 0        # sequence number of the frame in the slot
+        self._read_seq = 0   # sequence number of the last frame handed out
+        self._running = self._cap.isOpened()
+        self._released = False
+
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+
+        self._thread = None
+        if self._running:
+            # Reads block until the camera delivers, so they get their own OS
+            # thread rather than holding an offload thread CPU work needs
+            self._thread = native_loop(self._grab, self._store, "capture")
+
+    def _grab(self):
+        # Runs on the native reader thread, which must not touch self._cv
+        if not self._running:
+            return None
+        try:
+            return self._cap.read()
+        except Exception as e:
+            print(f"Camera read failed: {e}")
+            return False, None
+
+    def _store(self, result):
+        ret, frame = result
+        now = time.monotonic()
+
+        with self._cv:
+            if not ret or not self._running:
+                self._running = False
+                self._cv.notify_all()
+                return False
+
+            if self._seq > self._read_seq:
+                # Nobody picked up the previous frame in time
+                self.dropped += 1
+
+            self._frame = frame
+            self._frame_time = now
+            self._seq += 1
+            self.captured += 1
+            self._cv.notify_all()
+        return True
+
+    def isOpened(self):
+        """True while the camera is running or an unread frame is waiting"""
+        with self._cv:
+            return self._running or self._seq > self._read_seq
+
+    def read(self, timeout=None):
+        """
+        Wait for a frame newer than the last one returned
+
+        Args:
+            timeout: Seconds to wait for a new frame (None waits until the camera stops)
+
+        Returns:
+            Tuple of (ret, frame) like cv2.VideoCapture.read
+        """
+        with self._cv:
+            self._cv.wait_for(lambda: self._seq > self._read_seq or not self._running, timeout)
+            if self._seq == self._read_seq:
+                return False, None
+
+            self._read_seq = self._seq
+            self.delivered += 1
+            return True, self._frame
+
+    def frame_age(self):
+        """Seconds since the frame in the slot was captured"""
+        with self._cv:
+            if self._frame is None:
+                return 0.0
+            return time.monotonic() - self._frame_time
+
+    def release(self):
+        """Stop the reader thread and release the camera"""
+        with self._cv:
+            if self._released:
+                return
+            self._released = True
+            self._running = False
+            self._cv.notify_all()
+
+        # Let an in-progress read finish before the device goes away
+        if self._thread is not None and self._thread is not threading.current_thread():
+            offload(self._thread.join, timeout=1)
+        self._cap.release()
+
+    def stats(self):
+        """Return capture counters for diagnostics"""
+        with self._cv:
+            return {
+                'captured': self.captured,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'frame_age_ms': round((time.monotonic() - self._frame_time) * 1000, 1) if self._frame is not None else 0.0
+            }
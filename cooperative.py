@@ -0,0 +1,137 @@
+"""
+Offloading of blocking calls for the cooperative (eventlet) server
+
+Under eventlet every Socket.IO connection, HTTP request and session loop
+is a green thread sharing one OS thread, so a blocking C call (camera
+read, pose inference, JPEG encode/decode) stalls all of them, heartbeats
+included. ``offload`` runs such a call on eventlet's native thread pool,
+bounded to OFFLOAD_THREADS threads, and lets the hub serve other green
+threads until it returns. Without monkey patching (benchmarks, plain
+threaded servers) it simply calls the function.
+"""
+import os
+import queue
+import threading
+
+try:
+    from eventlet import hubs, patcher, tpool
+except ImportError:
+    hubs = patcher = tpool = None
+
+if tpool is not None:
+    # Must be set before the pool's first use
+    tpool.set_num_threads(int(os.environ.get('OFFLOAD_THREADS', os.cpu_count() or 4)))
+
+
+def is_cooperative():
+    """True when threading is monkey-patched into green threads"""
+    return patcher is not None and patcher.is_monkey_patched('thread')
+
+
+def native_thread(**kwargs):
+    """A real OS thread even when threading is monkey-patched (for code with its own event loop)"""
+    if patcher is not None:
+        return patcher.original('threading').Thread(**kwargs)
+    return threading.Thread(**kwargs)
+
+
+def native_queue():
+    """
+    Queue for handing work between native threads
+
+    Green locks must not be shared across OS threads, so native threads
+    talk to each other through an unpatched queue.
+    """
+    if patcher is not None:
+        return patcher.original('queue').Queue()
+    return queue.Queue()
+
+
+def wait_readable(fileno):
+    """Block until a file descriptor has data, yielding to other green threads meanwhile"""
+    if is_cooperative():
+        hubs.trampoline(fileno, read=True)
+
+
+def offload(func, *args, **kwargs):
+    """
+    Run a blocking call without stalling other green threads
+
+    Args:
+        func: Function that blocks in native code (and releases the GIL)
+
+    Returns:
+        Whatever func returns; exceptions propagate to the caller
+    """
+    if not is_cooperative():
+        return func(*args, **kwargs)
+    return tpool.execute(func, *args, **kwargs)
+
+
+def native_loop(step, deliver, name):
+    """
+    Call a blocking ``step`` over and over on its own OS thread
+
+    For blocking I/O such as a camera read, which waits for the next frame
+    most of the time and would otherwise hold one of the OFFLOAD_THREADS
+    that inference and JPEG work share. Each result is handed to
+    ``deliver`` on a green thread (the native thread wakes the hub through
+    a pipe, as the offload pool itself does), so ``deliver`` may use green
+    locks. The loop ends when ``step`` returns None or ``deliver`` returns
+    False; ``step`` should check its owner's state before blocking.
+
+    Returns:
+        The started OS thread, to join once the owner has stopped it
+    """
+    if not is_cooperative():
+        def run():
+            while True:
+                result = step()
+                if result is None or deliver(result) is False:
+                    break
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    native_os = patcher.original('os')
+    results = native_queue()
+    read_fd, write_fd = native_os.pipe()
+    native_os.set_blocking(read_fd, False)
+    stopped = []
+
+    def produce():
+        try:
+            while not stopped:
+                result = step()
+                if result is None:
+                    break
+                results.put(result)
+                try:
+                    native_os.write(write_fd, b'.')
+                except BrokenPipeError:
+                    # The green side has stopped delivering
+                    break
+        finally:
+            native_os.close(write_fd)
+
+    def pump():
+        try:
+            while True:
+                hubs.trampoline(read_fd, read=True)
+                try:
+                    closed = native_os.read(read_fd, 4096) == b''
+                except BlockingIOError:
+                    continue
+                while not results.empty():
+                    if deliver(results.get_nowait()) is False:
+                        stopped.append(True)
+                        return
+                if closed:
+                    return
+        finally:
+            native_os.close(read_fd)
+
+    thread = native_thread(target=produce, name=name, daemon=True)
+    thread.start()
+    threading.Thread(target=pump, name=f"{name}-deliver", daemon=True).start()
+    return thread
@@ -0,0 +1,803 @@
+"""
+Declarative exercise engine
+
+Exercises are described as data (an ExerciseSpec): the joint triplets to
+measure, rep counters driven by threshold conditions, form violation rules
+and what to draw. One tracker evaluates any spec, computing every angle the
+spec needs in a single vectorized call, and one generator loop shares the
+capture, inference, drawing and encoding stages between all exercises.
+
+Conditions are ``(measure, op, value)`` tuples where op is one of
+``<``, ``<=``, ``>``, ``>=``, ``between`` or ``outside`` (value is then a
+``(low, high)`` pair, inclusive). Inside a side context a measure name such
+as ``elbow`` resolves to ``left_elbow``/``right_elbow`` when that exists.
+"""
+import os
+import time
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+from adaptive_pose import AdaptivePoseEstimator
+from capture import LatestFrameCapture
+from frame_encoder import get_frame_encoder, mjpeg_part
+from overlay import draw_banner, draw_static_text
+from utils import calculate_angles, to_pixels, LANDMARK, NUM_LANDMARKS
+
+SIDES = ('left', 'right')
+
+GREEN = (0, 255, 0)
+RED = (0, 0, 255)
+BLUE = (255, 0, 0)
+WHITE = (255, 255, 255)
+YELLOW = (0, 255, 255)
+
+
+@dataclass
+class Mid:
+    """Derived point halfway between two points"""
+    name: str
+    a: str
+    b: str
+
+
+@dataclass
+class Above:
+    """Derived point a fixed normalized distance above another point"""
+    name: str
+    point: str
+    distance: float
+
+
+@dataclass
+class Offset:
+    """Coordinate difference ``a - b`` along one axis, optionally absolute and in pixels"""
+    name: str
+    a: str
+    b: str
+    axis: str = 'y'
+    absolute: bool = False
+    pixels: bool = False
+
+
+@dataclass
+class Difference:
+    """Absolute difference between two other measures"""
+    name: str
+    a: str
+    b: str
+
+
+@dataclass
+class RepCounter:
+    """
+    Two-stage rep state machine
+
+    The stage becomes 'down' whenever the down conditions hold and a rep is
+    counted when the up conditions hold while the stage is 'down'.
+
+    mode is 'per_side' (one counter per side, named after the side), 'any'
+    (one shared counter any side can move) or 'all' (every side must agree).
+    With gate=True no rep is counted while a form violation is active.
+    With sticky=True an 'all' counter keeps each side's own stage between
+    frames: a side stays where it was while between the thresholds, and
+    the sides need not cross them on the same frame.
+    """
+    down: list
+    up: list
+    name: str = 'reps'
+    mode: str = 'any'
+    initial: str = None
+    gate: bool = False
+    sticky: bool = False
+
+
+@dataclass
+class Violation:
+    """
+    Form rule that is active while all of its conditions hold
+
+    message is a string, or a dict with 'left'/'right'/'both' variants for
+    per-side rules. A rule without a message only pauses gated counters.
+    Rules earlier in the spec take priority for feedback.
+    """
+    key: str
+    when: list
+    message: object = None
+    per_side: bool = True
+    highlight: str = None
+
+
+@dataclass
+class Hold:
+    """Timed hold that runs while the conditions hold on every side"""
+    when: list
+    message: str = None
+
+
+@dataclass
+class Label:
+    """Measure value drawn next to a joint; colors is a list of (condition, color)"""
+    measure: str
+    anchor: str
+    fmt: str = ' {}'
+    color: tuple = WHITE
+    colors: list = field(default_factory=list)
+    offset: tuple = (0, 0)
+    scale: float = 0.5
+    thickness: int = 2
+
+
+@dataclass
+class Text:
+    """
+    Static or templated HUD text
+
+    Negative y positions are measured from the bottom of the frame. The
+    template is formatted with counters, '<counter>_stage', integer measures
+    and 'hold_time'.
+    """
+    template: str
+    position: tuple
+    color: tuple = BLUE
+    scale: float = 1
+    thickness: int = 2
+    only_when_good: bool = False
+
+
+@dataclass
+class Status:
+    """Form status line that switches text and color with the form state"""
+    position: tuple
+    good: str = "GOOD FORM"
+    bad: str = "FIX YOUR FORM"
+
+
+@dataclass
+class Banner:
+    """Style of the feedback message drawn on a translucent background"""
+    position: str = 'center'
+    scale: float = 1
+    color: tuple = RED
+    alpha: float = 0.5
+
+
+@dataclass
+class ExerciseSpec:
+    """
+    Complete description of one exercise
+
+    sides is a tuple of sides, or 'visible' to follow whichever side faces
+    the camera. angles maps a name to a (first, mid, end) point triplet.
+    feedback is 'voice' (spoken instructions) or 'sound' (alert sound).
+    """
+    name: str
+    angles: dict
+    sides: object = SIDES
+    points: list = field(default_factory=list)
+    offsets: list = field(default_factory=list)
+    differences: list = field(default_factory=list)
+    counters: list = field(default_factory=list)
+    violations: list = field(default_factory=list)
+    hold: Hold = None
+    flip: bool = True
+    feedback: str = 'sound'
+    audio_prefix: str = ''
+    feedback_cooldown: float = None
+    connections: list = field(default_factory=list)
+    cross_connections: list = field(default_factory=list)
+    joints: list = field(default_factory=list)
+    labels: list = field(default_factory=list)
+    hud: list = field(default_factory=list)
+    status: Status = None
+    banner: Banner = field(default_factory=Banner)
+    draw_extra: object = None
+    start_message: str = None
+
+
+@dataclass
+class FrameResult:
+    """Outcome of evaluating one frame against a spec"""
+    measures: dict
+    counters: dict
+    stages: dict
+    violations: list
+    feedback_key: str
+    feedback: str
+    good_form: bool
+    hold_seconds: float
+    sides: tuple
+    reps_counted: list
+    highlighted: list = field(default_factory=list)
+
+    def to_dict(self):
+        """JSON-friendly view of the result"""
+        return {
+            'angles': {name: round(value, 1) for name, value in self.measures.items()},
+            'counters': dict(self.counters),
+            'stages': dict(self.stages),
+            'violations': list(self.violations),
+            'feedback_key': self.feedback_key,
+            'feedback': self.feedback,
+            'good_form': self.good_form,
+            'hold_seconds': round(self.hold_seconds, 1),
+            'sides': list(self.sides),
+            'highlighted': list(self.highlighted)
+        }
+
+
+class CompiledSpec:
+    """
+    Spec resolved to integer index tables
+
+    Point names become rows of an extended point array (landmarks followed by
+    derived points) and every angle becomes one row of a triplet index array,
+    so a frame needs one fancy index and one calculate_angles call.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.sides = SIDES if spec.sides == 'visible' else tuple(spec.sides)
+
+        self.point_index = dict(LANDMARK)
+        self.mids = []
+        self.aboves = []
+        for point in spec.points:
+            for name, args in self._expand_point(point):
+                index = NUM_LANDMARKS + len(self.mids) + len(self.aboves)
+                self.point_index[name] = index
+                if isinstance(point, Mid):
+                    self.mids.append((index, self.point_index[args[0]], self.point_index[args[1]]))
+                else:
+                    self.aboves.append((index, self.point_index[args[0]], args[1]))
+        self.num_points = NUM_LANDMARKS + len(self.mids) + len(self.aboves)
+
+        self.angle_names = []
+        triplets = []
+        for name, triplet in spec.angles.items():
+            for full_name, points in self._expand(name, triplet):
+                self.angle_names.append(full_name)
+                triplets.append([self.point_index[p] for p in points])
+        self.triplets = np.array(triplets, dtype=np.intp).reshape(-1, 3)
+
+        self.offsets = []
+        for offset in spec.offsets:
+            axis = 0 if offset.axis == 'x' else 1
+            for full_name, (a, b) in self._expand(offset.name, (offset.a, offset.b)):
+                self.offsets.append((full_name, self.point_index[a], self.point_index[b], axis, offset))
+
+        self.measure_names = set(self.angle_names)
+        self.measure_names.update(name for name, _, _, _, _ in self.offsets)
+        self.measure_names.update(difference.name for difference in spec.differences)
+
+        self.segments = self._resolve_pairs(spec.connections)
+        self.cross_segments = [(self.point_index[a], self.point_index[b]) for a, b in spec.cross_connections]
+        self.joint_indices = {
+            side: [self.point_index[self._side_name(side, j)] for j in spec.joints]
+            for side in self.sides
+        }
+
+    def _side_name(self, side, name):
+        """Resolve a possibly side-relative point or measure name"""
+        candidate = f'{side}_{name}'
+        return candidate if candidate in self.point_index else name
+
+    def side_measure(self, side, name):
+        """Resolve a possibly side-relative measure name"""
+        candidate = f'{side}_{name}'
+        return candidate if candidate in self.measure_names else name
+
+    def _is_side_relative(self, names):
+        return any(f'left_{n}' in self.point_index for n in names)
+
+    def _expand_point(self, point):
+        sources = (point.a, point.b) if isinstance(point, Mid) else (point.point,)
+        if not self._is_side_relative(sources):
+            args = sources if isinstance(point, Mid) else (point.point, point.distance)
+            return [(point.name, args)]
+
+        expanded = []
+        for side in self.sides:
+            resolved = tuple(self._side_name(side, s) for s in sources)
+            args = resolved if isinstance(point, Mid) else (resolved[0], point.distance)
+            expanded.append((f'{side}_{point.name}', args))
+            # Later points in the same spec may refer to this one relative to a side
+            self.point_index[f'{side}_{point.name}'] = -1
+        return expanded
+
+    def _expand(self, name, points):
+        if not self._is_side_relative(points):
+            return [(name, points)]
+        return [
+            (f'{side}_{name}', tuple(self._side_name(side, p) for p in points))
+            for side in self.sides
+        ]
+
+    def _resolve_pairs(self, pairs):
+        return {
+            side: [
+                (self.point_index[self._side_name(side, a)], self.point_index[self._side_name(side, b)])
+                for a, b in pairs
+            ]
+            for side in self.sides
+        }
+
+    def points(self, landmarks):
+        """Return the (num_points, 2) array of landmark and derived point coordinates"""
+        if self.num_points == NUM_LANDMARKS:
+            return landmarks[:, :2]
+
+        points = np.empty((self.num_points, 2), dtype=np.float32)
+        points[:NUM_LANDMARKS] = landmarks[:, :2]
+        for index, a, b in self.mids:
+            points[index] = (points[a] + points[b]) / 2
+        for index, source, distance in self.aboves:
+            points[index, 0] = points[source, 0]
+            points[index, 1] = points[source, 1] - distance
+        return points
+
+    def measures(self, points, image_shape):
+        """Compute every angle, offset and difference the spec uses"""
+        measures = dict(zip(self.angle_names, calculate_angles(points[self.triplets]).tolist()))
+
+        for name, a, b, axis, offset in self.offsets:
+            value = float(points[a, axis] - points[b, axis])
+            if offset.absolute:
+                value = abs(value)
+            if offset.pixels:
+                value *= image_shape[1] if axis == 0 else image_shape[0]
+            measures[name] = value
+
+        for difference in self.spec.differences:
+            measures[difference.name] = abs(measures[difference.a] - measures[difference.b])
+
+        return measures
+
+
+def _check(condition, measures, side=None):
+    name, op, value = condition
+    if side is not None and f'{side}_{name}' in measures:
+        name = f'{side}_{name}'
+    measure = measures[name]
+
+    if op == '<':
+        return measure < value
+    if op == '<=':
+        return measure <= value
+    if op == '>':
+        return measure > value
+    if op == '>=':
+        return measure >= value
+    if op == 'between':
+        return value[0] <= measure <= value[1]
+    if op == 'outside':
+        return not value[0] <= measure <= value[1]
+    raise ValueError(f"Unknown condition operator: {op}")
+
+
+def _check_all(conditions, measures, side=None):
+    return all(_check(condition, measures, side) for condition in conditions)
+
+
+class ExerciseTracker:
+    """
+    Evaluates frames against one exercise spec and keeps its rep state
+
+    Pure logic: no capture, drawing or audio, so the same tracker serves the
+    MJPEG generators, the Socket.IO pipeline and the WebRTC track.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.compiled = CompiledSpec(spec)
+        self.counters = {}
+        self.stages = {}
+        for counter in spec.counters:
+            for name in self._counter_names(counter):
+                self.counters[name] = 0
+                self.stages[name] = counter.initial
+        # (counter name, side) -> stage, for sticky 'all' counters
+        self.side_stages = {}
+        self.hold_started = None
+        self.hold_seconds = 0.0
+
+    def _counter_names(self, counter):
+        if counter.mode == 'per_side':
+            return list(self.compiled.sides)
+        return [counter.name]
+
+    def active_sides(self, landmarks):
+        """Sides evaluated this frame ('visible' picks the side facing the camera)"""
+        if self.spec.sides != 'visible':
+            return self.compiled.sides
+        left = landmarks[LANDMARK['left_shoulder'], 3]
+        right = landmarks[LANDMARK['right_shoulder'], 3]
+        return ('left',) if left > right else ('right',)
+
+    def update(self, landmarks, image_shape, timestamp=None):
+        """
+        Evaluate one frame
+
+        Args:
+            landmarks: (33, 4) landmark array (see utils.landmarks_to_array)
+            image_shape: Shape of the frame the landmarks belong to
+            timestamp: Frame time in seconds (defaults to now)
+
+        Returns:
+            FrameResult for the frame
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        spec = self.spec
+        sides = self.active_sides(landmarks)
+        points = self.compiled.points(landmarks)
+        measures = self.compiled.measures(points, image_shape)
+
+        # Violations, in priority order
+        violations = []
+        violated_sides = {}
+        for rule in spec.violations:
+            if rule.per_side:
+                hit = [side for side in sides if _check_all(rule.when, measures, side)]
+            else:
+                hit = list(sides) if _check_all(rule.when, measures) else []
+            if hit:
+                violations.append(rule.key)
+                violated_sides[rule.key] = hit
+
+        feedback_key, feedback = None, ""
+        for rule in spec.violations:
+            if rule.key in violated_sides and rule.message:
+                feedback_key, feedback = self._feedback(rule, violated_sides[rule.key])
+                break
+
+        # Timed hold
+        good_form = not violations
+        if spec.hold is not None:
+            holding = all(_check_all(spec.hold.when, measures, side) for side in sides)
+            if holding:
+                if self.hold_started is None:
+                    self.hold_started = timestamp
+                self.hold_seconds = timestamp - self.hold_started
+            else:
+                self.hold_started = None
+                self.hold_seconds = 0.0
+                if feedback_key is None and spec.hold.message:
+                    feedback_key, feedback = 'hold', spec.hold.message
+            good_form = good_form and holding
+
+        # Rep counters
+        reps_counted = []
+        for counter in spec.counters:
+            gated = counter.gate and bool(violations)
+            if counter.mode == 'per_side':
+                for side in sides:
+                    self._step(counter, side, _check_all(counter.down, measures, side),
+                               _check_all(counter.up, measures, side), gated, reps_counted)
+            elif counter.mode == 'all' and counter.sticky:
+                for side in sides:
+                    if _check_all(counter.down, measures, side):
+                        self.side_stages[(counter.name, side)] = 'down'
+                    elif _check_all(counter.up, measures, side):
+                        self.side_stages[(counter.name, side)] = 'up'
+                side_stages = [self.side_stages.get((counter.name, side)) for side in sides]
+                self._step(counter, counter.name,
+                           all(stage == 'down' for stage in side_stages),
+                           all(stage == 'up' for stage in side_stages),
+                           gated, reps_counted)
+            elif counter.mode == 'all':
+                self._step(counter, counter.name,
+                           all(_check_all(counter.down, measures, side) for side in sides),
+                           all(_check_all(counter.up, measures, side) for side in sides),
+                           gated, reps_counted)
+            else:
+                for side in sides:
+                    self._step(counter, counter.name, _check_all(counter.down, measures, side),
+                               _check_all(counter.up, measures, side), gated, reps_counted)
+
+        highlighted = set()
+        for rule in spec.violations:
+            if rule.highlight and rule.key in violated_sides:
+                for side in violated_sides[rule.key]:
+                    highlighted.add(self.compiled.side_measure(side, rule.highlight))
+
+        return FrameResult(
+            measures=measures,
+            counters=dict(self.counters),
+            stages=dict(self.stages),
+            violations=violations,
+            feedback_key=feedback_key,
+            feedback=feedback,
+            good_form=good_form,
+            hold_seconds=self.hold_seconds,
+            sides=sides,
+            reps_counted=reps_counted,
+            highlighted=sorted(highlighted)
+        )
+
+    def _step(self, counter, name, is_down, is_up, gated, reps_counted):
+        if is_down:
+            self.stages[name] = 'down'
+        if is_up and self.stages[name] == 'down' and not gated:
+            self.stages[name] = 'up'
+            self.counters[name] += 1
+            reps_counted.append(name)
+            print(f"{self.spec.name} {name} rep counted! Total: {self.counters[name]}")
+
+    def _feedback(self, rule, sides):
+        if not isinstance(rule.message, dict):
+            return rule.key, rule.message
+        which = 'both' if len(sides) > 1 else sides[0]
+        return f'{which}_{rule.key}', rule.message[which]
+
+
+def _position(position, image):
+    x, y = position
+    return (x, image.shape[0] + y if y < 0 else y)
+
+
+def hud_context(result):
+    """Values available to Text templates"""
+    context = {name: int(value) for name, value in result.measures.items()}
+    context.update(result.counters)
+    for name, stage in result.stages.items():
+        context[f'{name}_stage'] = stage if stage else "None"
+    minutes, seconds = divmod(int(result.hold_seconds), 60)
+    context['hold_time'] = f'{minutes:02d}:{seconds:02d}'
+    return context
+
+
+def draw_frame(image, tracker, landmarks, result):
+    """
+    Draw the skeleton, angle labels, HUD text and feedback for one frame
+
+    Args:
+        image: BGR frame to draw on (modified in place)
+        tracker: ExerciseTracker that produced the result
+        landmarks: (33, 4) landmark array for the frame
+        result: FrameResult from tracker.update
+    """
+    spec = tracker.spec
+    compiled = tracker.compiled
+    pixels = to_pixels(compiled.points(landmarks), image.shape)
+
+    for a, b in compiled.cross_segments:
+        cv2.line(image, pixels[a], pixels[b], YELLOW, 2)
+
+    for side in result.sides:
+        for a, b in compiled.segments[side]:
+            cv2.line(image, pixels[a], pixels[b], GREEN, 2)
+        for index in compiled.joint_indices[side]:
+            cv2.circle(image, pixels[index], 7, RED, -1)
+
+        for label in spec.labels:
+            measure = compiled.side_measure(side, label.measure)
+            value = result.measures[measure]
+            color = label.color
+            for condition, band_color in label.colors:
+                if _check(condition, result.measures, side):
+                    color = band_color
+                    break
+            if measure in result.highlighted:
+                color = RED
+            anchor = pixels[compiled.point_index[compiled._side_name(side, label.anchor)]]
+            position = (anchor[0] + label.offset[0], anchor[1] + label.offset[1])
+            cv2.putText(image, label.fmt.format(int(value)), position,
+                        cv2.FONT_HERSHEY_SIMPLEX, label.scale, color, label.thickness, cv2.LINE_AA)
+
+    if spec.draw_extra is not None:
+        spec.draw_extra(image, pixels, compiled, result)
+
+    context = hud_context(result)
+    for text in spec.hud:
+        if text.only_when_good and not result.good_form:
+            continue
+        position = _position(text.position, image)
+        if '{' not in text.template:
+            # Guidance lines never change, composite them from the sprite cache
+            draw_static_text(image, text.template, position, text.scale, text.color, text.thickness)
+            continue
+        cv2.putText(image, text.template.format(**context), position,
+                    cv2.FONT_HERSHEY_SIMPLEX, text.scale, text.color, text.thickness, cv2.LINE_AA)
+
+    if spec.status is not None:
+        status_text = spec.status.good if result.good_form else spec.status.bad
+        status_color = GREEN if result.good_form else RED
+        draw_static_text(image, status_text, _position(spec.status.position, image), 1, status_color, 2)
+
+    if result.feedback and result.feedback_key != 'hold':
+        banner = spec.banner
+        draw_banner(image, result.feedback, banner.position, banner.scale, banner.color, banner.alpha)
+
+
+def render_plan(tracker):
+    """
+    Drawing instructions for clients that render the overlay themselves
+
+    Indices refer to the extended point array: the 33 landmarks followed by
+    the spec's derived points, which the client rebuilds from ``mids``
+    (halfway between two points) and ``aboves`` (a point raised by a
+    normalized distance).
+
+    Args:
+        tracker: ExerciseTracker for the session
+
+    Returns:
+        JSON-friendly dictionary, sent once when the session starts
+    """
+    spec = tracker.spec
+    compiled = tracker.compiled
+    return {
+        'exercise': spec.name,
+        'flip': spec.flip,
+        'num_points': compiled.num_points,
+        'mids': [list(mid) for mid in compiled.mids],
+        'aboves': [[index, source, distance] for index, source, distance in compiled.aboves],
+        'cross_segments': [list(pair) for pair in compiled.cross_segments],
+        'segments': {side: [list(pair) for pair in pairs] for side, pairs in compiled.segments.items()},
+        'joints': compiled.joint_indices,
+        'labels': {
+            side: [
+                {
+                    'measure': compiled.side_measure(side, label.measure),
+                    'anchor': compiled.point_index[compiled._side_name(side, label.anchor)],
+                    'format': label.fmt,
+                    'offset': list(label.offset)
+                }
+                for label in spec.labels
+            ]
+            for side in compiled.sides
+        }
+    }
+
+
+class FeedbackPlayer:
+    """
+    Plays audio feedback for a spec's violations
+
+    'voice' specs get spoken instructions generated with gTTS and cached in
+    the audio directory; 'sound' specs toggle the alert sound passed in by
+    the app.
+    """
+
+    def __init__(self, spec, sound):
+        self.spec = spec
+        self.sound = sound
+        self.voices = {}
+        self.current_key = None
+        self.last_played = 0
+
+        if spec.feedback == 'voice':
+            self._load_voices()
+
+    def _messages(self):
+        messages = {}
+        for rule in self.spec.violations:
+            if isinstance(rule.message, dict):
+                for which, message in rule.message.items():
+                    messages[f'{which}_{rule.key}'] = message
+            elif rule.message:
+                messages[rule.key] = rule.message
+        return messages
+
+    def _load_voices(self):
+        try:
+            import pygame
+            from gtts import gTTS
+
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            os.makedirs("audio", exist_ok=True)
+
+            for key, message in self._messages().items():
+                prefix = f'{self.spec.audio_prefix}_' if self.spec.audio_prefix else ''
+                filepath = f"audio/{prefix}{key}.mp3"
+
+                # Create audio file if it doesn't exist
+                if not os.path.exists(filepath):
+                    print(f"Creating voice instruction: {filepath}")
+                    tts = gTTS(text=message, lang='en')
+                    tts.save(filepath)
+
+                self.voices[key] = pygame.mixer.Sound(filepath)
+        except ImportError:
+            print("gTTS not available, voice files must be created manually")
+        except Exception as e:
+            print(f"Error with voice setup: {e}")
+
+    def update(self, feedback_key):
+        """Start, switch or stop feedback for the current violation key"""
+        if self.spec.feedback == 'voice':
+            self._update_voice(feedback_key)
+        elif feedback_key and self.current_key is None:
+            self.sound.play()
+            self.current_key = feedback_key
+        elif not feedback_key and self.current_key is not None:
+            self.sound.stop()
+            self.current_key = None
+
+    def _update_voice(self, feedback_key):
+        import pygame
+
+        if not feedback_key:
+            if self.current_key is not None:
+                # Form corrected, stop voice feedback immediately
+                pygame.mixer.stop()
+                self.current_key = None
+            return
+
+        now = time.time()
+        cooldown = self.spec.feedback_cooldown
+        repeat = cooldown is not None and now - self.last_played > cooldown
+        if feedback_key != self.current_key or repeat:
+            pygame.mixer.stop()
+            if feedback_key in self.voices:
+                self.voices[feedback_key].play()
+                print(f"Playing voice instruction: {feedback_key}")
+            else:
+                print(f"Warning: Missing voice for {feedback_key}")
+            self.current_key = feedback_key
+            self.last_played = now
+
+    def close(self):
+        if self.current_key is not None:
+            self.update(None)
+
+
+def run_exercise(spec, sound, pose):
+    """
+    Capture, track and stream one exercise as MJPEG parts
+
+    Args:
+        spec: ExerciseSpec to run
+        sound: Sound object for alert feedback
+        pose: Object with a mediapipe-style process(image) method
+
+    Yields:
+        Video frames with pose tracking
+    """
+    tracker = ExerciseTracker(spec)
+    player = FeedbackPlayer(spec, sound)
+    estimator = AdaptivePoseEstimator(pose)
+    encoder = get_frame_encoder()
+    # Newest frame only, so slow inference never works through a camera backlog
+    cap = LatestFrameCapture(0)
+    # Frame N encodes on the pool while frame N+1 runs inference
+    pending = None
+
+    if spec.start_message:
+        print(spec.start_message)
+
+    try:
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            if spec.flip:
+                frame = cv2.flip(frame, 1)
+            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            landmarks = estimator.estimate(image)
+            image = frame
+
+            if pending is not None:
+                jpeg = pending.result()
+                pending = None
+                if jpeg is not None:
+                    # Yield the frame to the Flask response
+                    yield mjpeg_part(jpeg)
+
+            if landmarks is not None:
+                result = tracker.update(landmarks, image.shape)
+                player.update(result.feedback_key)
+                draw_frame(image, tracker, landmarks, result)
+
+            pending = encoder.submit(image)
+
+        if pending is not None:
+            jpeg = pending.result()
+            if jpeg is not None:
+                yield mjpeg_part(jpeg)
+    finally:
+        cap.release()
+        player.close()
@@ -1,7 +1,29 @@
-import cv2
-from utils import calculate_angle, mp_pose, pose
+from inference_scheduler import scheduled_pose
+from exercises.engine import ExerciseSpec, RepCounter, Violation, Label, Text, run_exercise
 
-def lunges(sound):
+LUNGES = ExerciseSpec(
+    name='lunges',
+    angles={'knee': ('hip', 'knee', 'ankle')},
+    violations=[
+        Violation('knee_too_low', [('knee', '<', 70)],
+                  "DON'T DROP TOO LOW! KEEP YOUR KNEE ABOVE 70°", highlight='knee'),
+    ],
+    counters=[
+        RepCounter(down=[('knee', '<', 100)], up=[('knee', '>', 160)], mode='per_side'),
+    ],
+    connections=[('hip', 'knee'), ('knee', 'ankle'), ('shoulder', 'hip')],
+    cross_connections=[('left_shoulder', 'right_shoulder'), ('left_hip', 'right_hip')],
+    joints=['hip', 'knee', 'ankle'],
+    labels=[Label('knee', 'knee')],
+    hud=[
+        Text('Left Leg: {left}', (10, 50)),
+        Text('Right Leg: {right}', (10, 100)),
+    ],
+)
+
+
+@scheduled_pose
+def lunges(sound, pose=None):
     """
     Track lunges exercise
     
@@ -11,51 +33,4 @@ def lunges(sound):
     Yields:
         Video frames with pose tracking
     """
-    left_counter = 0
-    right_counter = 0
-    left_stage = None
-    right_stage = None
-    cap = cv2.VideoCapture(0)
-    sound_playing = False
-    
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        # Flip the frame horizontally
-        frame = cv2.flip(frame, 1)
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = pose.process(image)
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        
-        form_violated = False
-        
-        if results.pose_landmarks:
-            landmarks = results.pose_landmarks.landmark
-            
-            # Get leg landmarks for both legs
-            leg_sides = {
-                'left': {
-                    'hip': mp_pose.PoseLandmark.LEFT_HIP,
-                    'knee': mp_pose.PoseLandmark.LEFT_KNEE,
-                    'ankle': mp_pose.PoseLandmark.LEFT_ANKLE
-                },
-                'right': {
-                    'hip': mp_pose.PoseLandmark.RIGHT_HIP,
-                    'knee': mp_pose.PoseLandmark.RIGHT_KNEE,
-                    'ankle': mp_pose.PoseLandmark.RIGHT_ANKLE
-                }
-            }
-            
-            # Get coordinates for shoulders to check torso alignment
-            left_shoulder = [
-                landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y
-            ]
-            right_shoulder = [
-                landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y
-            ]
-            
-            # Draw
\ No newline at end of file
+    yield from run_exercise(LUNGES, sound, pose)
@@ -1,7 +1,9 @@
 import cv2
-from utils import calculate_angle, mp_pose, pose
+from utils import calculate_angle, mp_pose
+from inference_scheduler import scheduled_pose
 
-def dumbbell_front_raise(sound):
+@scheduled_pose
+def dumbbell_front_raise(sound, pose=None):
     """
     Track dumbbell front raise exercise
     
@@ -0,0 +1,104 @@
+import os
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from cooperative import offload
+
+# Chroma subsampling modes understood by JPEG_SUBSAMPLING (needs OpenCV 4.5.5+)
+SUBSAMPLING_FACTORS = {
+    '444': getattr(cv2, 'IMWRITE_JPEG_SAMPLING_FACTOR_444', None),
+    '422': getattr(cv2, 'IMWRITE_JPEG_SAMPLING_FACTOR_422', None),
+    '420': getattr(cv2, 'IMWRITE_JPEG_SAMPLING_FACTOR_420', None),
+}
+
+
+class FrameEncoder:
+    """
+    JPEG encoding stage backed by a worker pool
+
+    cv2.imencode releases the GIL, so handing frames to a small thread pool
+    lets frame N encode while the caller already runs inference on frame
+    N+1. Quality, chroma subsampling and output scale come from the
+    environment (JPEG_QUALITY, JPEG_SUBSAMPLING, JPEG_OUTPUT_SCALE) and can
+    be overridden per frame.
+    """
+
+    def __init__(self, workers=None, quality=None, subsampling=None, scale=None):
+        self.workers = workers or int(os.environ.get('ENCODE_WORKERS', min(4, os.cpu_count() or 1)))
+        self.quality = quality or int(os.environ.get('JPEG_QUALITY', 80))
+        self.subsampling = subsampling or os.environ.get('JPEG_SUBSAMPLING', '420')
+        self.scale = scale or float(os.environ.get('JPEG_OUTPUT_SCALE', 1.0))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="encode")
+
+        print(f"Frame encoder started with {self.workers} workers "
+              f"(quality {self.quality}, subsampling {self.subsampling}, scale {self.scale})")
+
+    def params(self, quality=None, subsampling=None):
+        """cv2.imencode parameters for the given settings"""
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(quality or self.quality)]
+        factor = SUBSAMPLING_FACTORS.get(subsampling or self.subsampling)
+        if factor is not None:
+            params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, factor]
+        return params
+
+    def encode(self, image, quality=None, subsampling=None, scale=None, as_base64=False):
+        """
+        Encode one frame on the calling thread
+
+        Args:
+            image: BGR frame
+            quality: JPEG quality 1-100 (defaults to the encoder setting)
+            subsampling: '444', '422' or '420'
+            scale: Output scale factor applied before encoding
+            as_base64: Return a base64 string instead of bytes
+
+        Returns:
+            JPEG bytes (or base64 text), None if encoding failed
+        """
+        scale = scale or self.scale
+        ret, buffer = offload(self._encode, image, scale, self.params(quality, subsampling))
+        if not ret:
+            return None
+        if as_base64:
+            return base64.b64encode(buffer).decode('utf-8')
+        return buffer.tobytes()
+
+    @staticmethod
+    def _encode(image, scale, params):
+        if scale != 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return cv2.imencode('.jpg', image, params)
+
+    def submit(self, image, **options):
+        """
+        Queue a frame for encoding on the pool
+
+        The caller must not draw on the image after submitting it.
+
+        Returns:
+            Future resolving to the encode() result
+        """
+        return self._executor.submit(self.encode, image, **options)
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_frame_encoder():
+    """Return the process-wide frame encoder, starting it on first use"""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = FrameEncoder()
+    return _encoder
+
+
+def mjpeg_part(jpeg):
+    """Wrap JPEG bytes as one multipart/x-mixed-replace part"""
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
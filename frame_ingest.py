@@ -0,0 +1,168 @@
+import os
+import time
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+from cooperative import offload
+
+
+class ClientFrameSource:
+    """
+    Frame source fed by JPEGs the browser uploads over Socket.IO
+
+    Stands in for the camera on hosts that have none (Cloud Run): the
+    client captures, compresses and pushes frames tagged with a sequence
+    number and capture timestamp, and the exercise loop reads them through
+    the same isOpened/read/release interface as LatestFrameCapture.
+
+    At most ``max_in_flight`` frames are held per session (queued plus the
+    one being processed). When a new frame arrives on a full session the
+    oldest queued frame is dropped in its favour. Every frame is eventually
+    acknowledged, processed or dropped, and each ack carries how many
+    credits the client has, so it can throttle itself instead of flooding
+    the server.
+    """
+
+    def __init__(self, max_in_flight=None, on_ack=None):
+        self.max_in_flight = max_in_flight or int(os.environ.get('INGEST_MAX_IN_FLIGHT', 2))
+        self._on_ack = on_ack
+        self._cv = threading.Condition()
+        self._queue = deque()   # (seq, captured_at, received_at, jpeg)
+        self._current = None    # frame being processed
+        self._closed = False
+        self._last_seq = -1
+
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.corrupt = 0
+
+    def _in_flight(self):
+        return len(self._queue) + (1 if self._current is not None else 0)
+
+    def credits(self):
+        """Frames the client may still send without waiting for an ack"""
+        with self._cv:
+            return max(0, self.max_in_flight - self._in_flight())
+
+    def push(self, seq, captured_at, jpeg):
+        """
+        Accept an uploaded frame
+
+        Args:
+            seq: Client sequence number (increasing)
+            captured_at: Client capture timestamp in milliseconds
+            jpeg: Compressed frame bytes
+
+        Returns:
+            True if the frame was queued
+        """
+        dropped = []
+        with self._cv:
+            if self._closed:
+                return False
+
+            self.received += 1
+            if seq <= self._last_seq:
+                # Out-of-order or repeated upload, already superseded
+                self.dropped += 1
+                dropped.append((seq, captured_at))
+                accepted = False
+            else:
+                self._last_seq = seq
+                while self._queue and self._in_flight() >= self.max_in_flight:
+                    stale_seq, stale_captured, _, _ = self._queue.popleft()
+                    self.dropped += 1
+                    dropped.append((stale_seq, stale_captured))
+
+                if self._in_flight() >= self.max_in_flight:
+                    # Only the frame being processed is left and it fills the window
+                    self.dropped += 1
+                    dropped.append((seq, captured_at))
+                    accepted = False
+                else:
+                    self._queue.append((seq, captured_at, time.monotonic(), jpeg))
+                    self._cv.notify()
+                    accepted = True
+
+        for dropped_seq, dropped_captured in dropped:
+            self._ack(dropped_seq, dropped_captured, 'dropped')
+        return accepted
+
+    def isOpened(self):
+        with self._cv:
+            return not self._closed
+
+    def read(self, timeout=None):
+        """
+        Wait for the next uploaded frame and decode it
+
+        Args:
+            timeout: Seconds to wait (None waits until the source is released)
+
+        Returns:
+            Tuple of (ret, frame) like cv2.VideoCapture.read
+        """
+        while True:
+            with self._cv:
+                if not self._cv.wait_for(lambda: self._queue or self._closed, timeout) or not self._queue:
+                    return False, None
+                seq, captured_at, received_at, jpeg = self._queue.popleft()
+                self._current = (seq, captured_at, received_at)
+
+            frame = offload(cv2.imdecode, np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                return True, frame
+
+            with self._cv:
+                self.corrupt += 1
+                self._current = None
+            self._ack(seq, captured_at, 'dropped')
+
+    def current(self):
+        """(seq, captured_at) of the frame being processed, or None"""
+        with self._cv:
+            return self._current[:2] if self._current is not None else None
+
+    def complete(self):
+        """Mark the frame returned by the last read as processed and acknowledge it"""
+        with self._cv:
+            if self._current is None:
+                return
+            seq, captured_at, received_at = self._current
+            self._current = None
+            self.processed += 1
+        self._ack(seq, captured_at, 'processed', (time.monotonic() - received_at) * 1000)
+
+    def _ack(self, seq, captured_at, status, server_ms=None):
+        if self._on_ack is None:
+            return
+        self._on_ack({
+            'seq': seq,
+            'captured_at': captured_at,
+            'status': status,
+            'server_ms': round(server_ms, 1) if server_ms is not None else None,
+            'credits': self.credits()
+        })
+
+    def release(self):
+        """Stop accepting frames and wake up a waiting reader"""
+        with self._cv:
+            self._closed = True
+            self._queue.clear()
+            self._cv.notify_all()
+
+    def stats(self):
+        """Return ingestion counters for diagnostics"""
+        with self._cv:
+            return {
+                'received': self.received,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'corrupt': self.corrupt,
+                'in_flight': self._in_flight(),
+                'max_in_flight': self.max_in_flight
+            }
@@ -0,0 +1,61 @@
+import os
+import time
+
+
+class FramePacer:
+    """
+    Deadline-based pacing for a frame loop
+
+    Each frame is due one interval after the previous deadline, and the
+    loop sleeps only for whatever is left of the interval after its own
+    work. When a frame overruns its deadline the pacer does not try to
+    catch up with a burst of back-to-back frames: the slots that were
+    missed are skipped and the schedule restarts from now.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or float(os.environ.get('FRAME_INTERVAL_MS', 33)) / 1000
+        self._deadline = None
+        self._last_frame = None
+        self._frame_time = None
+
+        self.frames = 0
+        self.deadline_misses = 0
+        self.skipped = 0
+
+    def set_fps(self, fps):
+        """Change the target rate, taking effect from the next frame"""
+        self.interval = 1.0 / fps
+
+    def wait(self):
+        """Sleep until the next frame is due; call once at the end of each frame"""
+        now = time.monotonic()
+        self.frames += 1
+
+        if self._deadline is None:
+            self._deadline = now
+        self._deadline += self.interval
+
+        if now < self._deadline:
+            time.sleep(self._deadline - now)
+        else:
+            self.deadline_misses += 1
+            self.skipped += int((now - self._deadline) / self.interval)
+            self._deadline = now
+
+        woke = time.monotonic()
+        if self._last_frame is not None:
+            # Smoothed wake-to-wake period for the achieved rate
+            period = woke - self._last_frame
+            self._frame_time = period if self._frame_time is None else 0.9 * self._frame_time + 0.1 * period
+        self._last_frame = woke
+
+    def stats(self):
+        """Return target and achieved rates with miss counts for diagnostics"""
+        return {
+            'target_fps': round(1.0 / self.interval, 1),
+            'achieved_fps': round(1.0 / self._frame_time, 1) if self._frame_time else None,
+            'frames': self.frames,
+            'deadline_misses': self.deadline_misses,
+            'skipped': self.skipped
+        }
@@ -0,0 +1,298 @@
+import os
+import math
+import time
+import uuid
+import functools
+import threading
+from collections import deque
+from concurrent.futures import Future, CancelledError
+from types import SimpleNamespace
+
+from pose_pool import get_pose_pool, worker_cpus
+from pose_workers import RemotePose
+from cooperative import offload
+
+# Result handed back for frames that were dropped before inference
+EMPTY_RESULT = SimpleNamespace(pose_landmarks=None)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list, 0.0 when empty"""
+    if not values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(values)) - 1)
+    return round(values[rank], 1)
+
+
+class InferenceScheduler:
+    """
+    Single inference scheduler shared by every active session
+
+    Frames are queued per session and a bounded set of worker threads serves
+    the sessions round-robin, one frame per turn, so a fast client cannot
+    starve the others. Each session's frames run in order on that session's
+    own pose instance from the pool. Queues are short and frames that waited
+    longer than ``max_frame_age`` are dropped rather than processed late.
+    """
+
+    def __init__(self, workers=None, max_queue=None, max_frame_age=None, pool=None):
+        self.workers = workers or int(os.environ.get('INFERENCE_WORKERS', worker_cpus()))
+        self.max_queue = max_queue or int(os.environ.get('INFERENCE_MAX_QUEUE', 2))
+        self.max_frame_age = max_frame_age or float(os.environ.get('INFERENCE_MAX_FRAME_AGE', 0.5))
+        self._pool = pool or get_pose_pool()
+
+        self._cv = threading.Condition()
+        self._queues = {}      # session_id -> deque of (image, submitted_at, future)
+        self._ready = deque()  # sessions with queued frames, in round-robin order
+        self._busy = set()     # sessions with a frame currently on a worker
+        self._closing = set()  # sessions unregistered while a frame was running
+        self._stats = {}
+        # (finished at, queue wait ms, processing ms) of recent frames, for load shedding
+        self._samples = deque(maxlen=int(os.environ.get('INFERENCE_SAMPLES', 1000)))
+
+        for i in range(self.workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"inference-{i}")
+            worker.daemon = True
+            worker.start()
+
+        print(f"Inference scheduler started with {self.workers} workers")
+
+    def submit(self, session_id, image):
+        """
+        Queue a frame for pose inference
+
+        Args:
+            session_id: Session the frame belongs to
+            image: RGB frame for mediapipe
+
+        Returns:
+            Future resolving to the mediapipe results (cancelled if the frame is dropped)
+        """
+        future = Future()
+
+        with self._cv:
+            queue = self._queues.get(session_id)
+            if queue is None:
+                queue = self._queues[session_id] = deque()
+                self._stats[session_id] = {
+                    'processed': 0,
+                    'dropped': 0,
+                    'avg_wait_ms': 0.0,
+                    'last_wait_ms': 0.0
+                }
+                self._closing.discard(session_id)
+
+            # Keep the queue short by dropping the oldest frame
+            while len(queue) >= self.max_queue:
+                _, _, stale = queue.popleft()
+                stale.cancel()
+                self._stats[session_id]['dropped'] += 1
+
+            queue.append((image, time.monotonic(), future))
+
+            if session_id not in self._busy and session_id not in self._ready:
+                self._ready.append(session_id)
+                self._cv.notify()
+
+        return future
+
+    def infer(self, session_id, image):
+        """
+        Run inference for one frame and wait for the result
+
+        Args:
+            session_id: Session the frame belongs to
+            image: RGB frame for mediapipe
+
+        Returns:
+            mediapipe results, or EMPTY_RESULT if the frame was dropped
+        """
+        future = self.submit(session_id, image)
+        try:
+            return future.result()
+        except CancelledError:
+            return EMPTY_RESULT
+
+    def unregister(self, session_id):
+        """
+        Drop a session's queued frames and return its pose instance to the pool
+
+        Args:
+            session_id: Session that has finished
+        """
+        with self._cv:
+            queue = self._queues.pop(session_id, None)
+            self._stats.pop(session_id, None)
+            if queue:
+                for _, _, future in queue:
+                    future.cancel()
+            if session_id in self._ready:
+                self._ready.remove(session_id)
+            if session_id in self._busy:
+                # The worker releases the instance once the running frame finishes
+                self._closing.add(session_id)
+                return
+
+        self._pool.release(session_id)
+
+    def stats(self):
+        """
+        Return queue depth and per-session wait times
+
+        Returns:
+            Dictionary with global and per-session scheduler statistics
+        """
+        with self._cv:
+            sessions = {}
+            for session_id, session_stats in self._stats.items():
+                sessions[session_id] = dict(session_stats, queued=len(self._queues.get(session_id, ())))
+
+            return {
+                'workers': self.workers,
+                'busy_workers': len(self._busy),
+                'queue_depth': sum(len(queue) for queue in self._queues.values()),
+                'sessions': sessions
+            }
+
+    def latency(self, window):
+        """
+        Queue wait and processing time percentiles over recent frames
+
+        Args:
+            window: Seconds of history to consider
+
+        Returns:
+            Dictionary with sample count and p50/p95 wait and processing times in ms
+        """
+        cutoff = time.monotonic() - window
+        with self._cv:
+            recent = [sample for sample in self._samples if sample[0] >= cutoff]
+
+        waits = sorted(sample[1] for sample in recent)
+        processing = sorted(sample[2] for sample in recent)
+        return {
+            'samples': len(recent),
+            'p50_wait_ms': percentile(waits, 50),
+            'p95_wait_ms': percentile(waits, 95),
+            'p50_process_ms': percentile(processing, 50),
+            'p95_process_ms': percentile(processing, 95)
+        }
+
+    def _next_frame(self):
+        """Wait for the next session in round-robin order and pop its oldest fresh frame"""
+        with self._cv:
+            while True:
+                while not self._ready:
+                    self._cv.wait()
+
+                session_id = self._ready.popleft()
+                queue = self._queues.get(session_id)
+                now = time.monotonic()
+
+                while queue:
+                    image, submitted_at, future = queue.popleft()
+                    if now - submitted_at > self.max_frame_age:
+                        future.cancel()
+                        self._stats[session_id]['dropped'] += 1
+                        continue
+
+                    self._busy.add(session_id)
+                    return session_id, image, submitted_at, future
+
+    def _finish_frame(self, session_id, wait, processing):
+        """Record stats for a processed frame and put the session back in the rotation"""
+        release = False
+
+        with self._cv:
+            self._busy.discard(session_id)
+            if processing is not None:
+                self._samples.append((time.monotonic(), wait * 1000, processing * 1000))
+
+            if session_id in self._closing:
+                self._closing.discard(session_id)
+                release = True
+            else:
+                session_stats = self._stats.get(session_id)
+                if session_stats is not None:
+                    wait_ms = wait * 1000
+                    session_stats['processed'] += 1
+                    session_stats['last_wait_ms'] = wait_ms
+                    session_stats['avg_wait_ms'] = 0.9 * session_stats['avg_wait_ms'] + 0.1 * wait_ms
+
+                if self._queues.get(session_id):
+                    # Back of the line so every other waiting session gets a turn first
+                    self._ready.append(session_id)
+                    self._cv.notify()
+
+        if release:
+            self._pool.release(session_id)
+
+    def _worker_loop(self):
+        while True:
+            session_id, image, submitted_at, future = self._next_frame()
+            wait = time.monotonic() - submitted_at
+            processing = None
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        pose = self._pool.acquire(session_id, timeout=float(os.environ.get('POSE_POOL_TIMEOUT', 5)))
+                        started = time.monotonic()
+                        # Worker-process poses wait cooperatively, in-process ones block in native code
+                        result = pose.process(image) if isinstance(pose, RemotePose) else offload(pose.process, image)
+                        processing = time.monotonic() - started
+                        future.set_result(result)
+                    except Exception as e:
+                        print(f"Error running inference for session {session_id}: {e}")
+                        future.set_exception(e)
+            finally:
+                self._finish_frame(session_id, wait, processing)
+
+
+class ScheduledPose:
+    """
+    Stand-in for a mediapipe Pose that routes ``process`` through the scheduler
+
+    Lets the exercise generators keep calling ``pose.process(image)`` while
+    their frames are queued fairly alongside every other session.
+    """
+
+    def __init__(self, scheduler, session_id):
+        self.scheduler = scheduler
+        self.session_id = session_id
+
+    def process(self, image):
+        return self.scheduler.infer(self.session_id, image)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_inference_scheduler():
+    """Return the process-wide inference scheduler, starting it on first use"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = InferenceScheduler()
+    return _scheduler
+
+
+def scheduled_pose(exercise_func):
+    """
+    Decorator for exercise generators that routes their inference through the scheduler
+
+    The wrapped generator receives a ScheduledPose as its ``pose`` keyword
+    argument and the session is unregistered when the stream ends or the
+    client goes away.
+    """
+    @functools.wraps(exercise_func)
+    def wrapper(*args, **kwargs):
+        scheduler = get_inference_scheduler()
+        session_id = uuid.uuid4().hex
+        try:
+            yield from exercise_func(*args, pose=ScheduledPose(scheduler, session_id), **kwargs)
+        finally:
+            scheduler.unregister(session_id)
+    return wrapper
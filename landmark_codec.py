@@ -0,0 +1,162 @@
+"""
+Compact binary wire format for streamed pose landmarks
+
+Coordinates are quantized to int16 (x, y and z in units of 1/COORD_SCALE
+of the frame, which covers -2..2 at about 0.06 px on a 1000 px frame) and
+visibility to uint8. A keyframe carries every landmark; a delta frame
+carries a bitmask plus only the landmarks that moved more than
+``threshold`` since they were last sent, so the decoded pose never lags the
+true one by more than the threshold.
+
+Packet layout (little-endian):
+
+    header   uint8 version, uint8 kind, uint16 seq, uint8 count
+    KEY      count x (int16 x, int16 y, int16 z, uint8 visibility)
+    DELTA    ceil(count / 8) byte bitmask, then one entry per set bit
+    EMPTY    nothing (no person in the frame)
+
+static/js/landmark_codec.js decodes the same format in the browser.
+"""
+import os
+import struct
+
+import numpy as np
+
+VERSION = 1
+
+KEY = 1
+DELTA = 2
+EMPTY = 3
+
+COORD_SCALE = 16384
+VISIBILITY_SCALE = 255
+
+HEADER = struct.Struct('<BBHB')
+ENTRY = np.dtype([('xyz', '<i2', 3), ('visibility', 'u1')])
+
+
+def quantize(landmarks):
+    """
+    Quantize a float landmark array to wire entries
+
+    Args:
+        landmarks: (N, 4) array of x, y, z, visibility
+
+    Returns:
+        Structured array of N entries
+    """
+    entries = np.empty(len(landmarks), dtype=ENTRY)
+    entries['xyz'] = np.clip(np.rint(landmarks[:, :3] * COORD_SCALE), -32768, 32767)
+    entries['visibility'] = np.clip(np.rint(landmarks[:, 3] * VISIBILITY_SCALE), 0, 255)
+    return entries
+
+
+def dequantize(entries):
+    """Inverse of quantize, returns an (N, 4) float32 array"""
+    landmarks = np.empty((len(entries), 4), dtype=np.float32)
+    landmarks[:, :3] = entries['xyz'] / COORD_SCALE
+    landmarks[:, 3] = entries['visibility'] / VISIBILITY_SCALE
+    return landmarks
+
+
+class LandmarkEncoder:
+    """
+    Per-session landmark encoder
+
+    Keeps the quantized state the client has reconstructed so far and
+    sends a keyframe every ``keyframe_interval`` frames (and after any
+    frame without a person), delta frames in between.
+    """
+
+    def __init__(self, keyframe_interval=None, threshold=None, visibility_threshold=0.05):
+        self.keyframe_interval = keyframe_interval or int(os.environ.get('LANDMARK_KEYFRAME_INTERVAL', 30))
+        threshold = threshold if threshold is not None else float(os.environ.get('LANDMARK_DELTA_THRESHOLD', 0.002))
+        self.threshold = int(round(threshold * COORD_SCALE))
+        self.visibility_threshold = int(round(visibility_threshold * VISIBILITY_SCALE))
+        self._sent = None
+        self._seq = 0
+        self._since_keyframe = 0
+
+    def force_keyframe(self):
+        """Send the full pose with the next frame (e.g. when a client (re)joins)"""
+        self._sent = None
+
+    def encode(self, landmarks):
+        """
+        Encode one frame's landmarks
+
+        Args:
+            landmarks: (N, 4) landmark array, or None when nobody is tracked
+
+        Returns:
+            Packet bytes
+        """
+        self._seq = (self._seq + 1) & 0xFFFF
+
+        if landmarks is None:
+            self._sent = None
+            return HEADER.pack(VERSION, EMPTY, self._seq, 0)
+
+        entries = quantize(landmarks)
+        count = len(entries)
+
+        if (self._sent is None or len(self._sent) != count
+                or self._since_keyframe + 1 >= self.keyframe_interval):
+            self._sent = entries
+            self._since_keyframe = 0
+            return HEADER.pack(VERSION, KEY, self._seq, count) + entries.tobytes()
+
+        moved = np.abs(entries['xyz'].astype(np.int32) - self._sent['xyz']).max(axis=1) > self.threshold
+        moved |= np.abs(entries['visibility'].astype(np.int32) - self._sent['visibility']) > self.visibility_threshold
+        self._sent[moved] = entries[moved]
+        self._since_keyframe += 1
+
+        mask = np.packbits(moved, bitorder='little')
+        return HEADER.pack(VERSION, DELTA, self._seq, count) + mask.tobytes() + entries[moved].tobytes()
+
+
+class LandmarkDecoder:
+    """
+    Rebuilds landmark arrays from encoder packets
+
+    Delta frames only apply on top of the packet just before them; after a
+    gap the decoder returns None until the next keyframe.
+    """
+
+    def __init__(self):
+        self._state = None
+        self._seq = None
+
+    def decode(self, packet):
+        """
+        Decode one packet
+
+        Args:
+            packet: Bytes produced by LandmarkEncoder.encode
+
+        Returns:
+            (N, 4) float32 landmark array, or None for an empty or undecodable frame
+        """
+        version, kind, seq, count = HEADER.unpack_from(packet)
+        if version != VERSION:
+            raise ValueError(f"Unsupported landmark packet version {version}")
+
+        in_sequence = self._seq is not None and seq == (self._seq + 1) & 0xFFFF
+        self._seq = seq
+
+        if kind == KEY:
+            self._state = np.frombuffer(packet, dtype=ENTRY, count=count, offset=HEADER.size).copy()
+        elif kind == DELTA:
+            if not in_sequence or self._state is None or len(self._state) != count:
+                self._state = None
+                return None
+            mask_size = (count + 7) // 8
+            mask = np.frombuffer(packet, dtype=np.uint8, count=mask_size, offset=HEADER.size)
+            moved = np.unpackbits(mask, count=count, bitorder='little').astype(bool)
+            self._state[moved] = np.frombuffer(packet, dtype=ENTRY, count=int(moved.sum()),
+                                               offset=HEADER.size + mask_size)
+        else:
+            self._state = None
+            return None
+
+        return dequantize(self._state)
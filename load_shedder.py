@@ -0,0 +1,179 @@
+import os
+import time
+import threading
+
+from inference_scheduler import get_inference_scheduler
+from quality_controller import quality_levels
+from session_table import SessionLimitReached
+
+# Shedding levels, each one also applies everything below it
+NORMAL = 0          # new sessions start at full quality
+REDUCED = 1         # new sessions get lower fps and resolution
+LANDMARKS_ONLY = 2  # new client-camera video sessions get pose data only, others are reduced
+REFUSING = 3        # new sessions are refused with a retry-after hint
+
+LEVEL_NAMES = ['normal', 'reduced', 'landmarks_only', 'refusing']
+
+
+class Overloaded(SessionLimitReached):
+    """Raised when new sessions are refused because inference is saturated"""
+
+    reason = 'overload'
+
+
+class LoadShedder:
+    """
+    Sheds load for new sessions when inference latency shows the box is saturated
+
+    Every ``interval`` seconds the p95 queue wait and p95 per-frame
+    processing time of the last ``window`` seconds of inference are
+    compared with their budgets; the larger ratio is the pressure. Pressure
+    above 1 for ``up_hold`` seconds raises the level by one, pressure below
+    ``recover_ratio`` for ``down_hold`` seconds lowers it by one, and
+    anything in between holds the current level, so the policy neither
+    flaps nor stays stuck once load drops.
+
+    Only sessions started while shedding are affected: running sessions keep
+    the quality they started with, which keeps each session predictable.
+    """
+
+    def __init__(self, scheduler=None, wait_budget=None, process_budget=None, window=None,
+                 up_hold=None, down_hold=None, recover_ratio=0.7, interval=0.5):
+        self.scheduler = scheduler or get_inference_scheduler()
+        self.wait_budget = wait_budget or float(os.environ.get('SHED_WAIT_MS', 100))
+        self.process_budget = process_budget or float(os.environ.get('SHED_PROCESS_MS', 60))
+        self.window = window or float(os.environ.get('SHED_WINDOW', 5))
+        self.up_hold = up_hold if up_hold is not None else float(os.environ.get('SHED_UP_HOLD', 2))
+        self.down_hold = down_hold if down_hold is not None else float(os.environ.get('SHED_DOWN_HOLD', 10))
+        self.min_samples = int(os.environ.get('SHED_MIN_SAMPLES', 10))
+        self.max_fps = float(os.environ.get('SHED_MAX_FPS', 15))
+        self.recover_ratio = recover_ratio
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self.level = NORMAL
+        self.pressure = 0.0
+        self.latency = {}
+        self._hot_since = None
+        self._calm_since = None
+        self._changed_at = time.monotonic()
+        self.shed = {name: 0 for name in LEVEL_NAMES[1:]}
+
+        monitor = threading.Thread(target=self._monitor, name="load-shedder", daemon=True)
+        monitor.start()
+
+    def _monitor(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.evaluate()
+            except Exception as e:
+                print(f"Error evaluating load: {e}")
+
+    def evaluate(self, now=None):
+        """Sample inference latency and move the level one step if pressure has held long enough"""
+        now = now if now is not None else time.monotonic()
+        latency = self.scheduler.latency(self.window)
+        if latency['samples'] >= self.min_samples:
+            pressure = max(latency['p95_wait_ms'] / self.wait_budget,
+                           latency['p95_process_ms'] / self.process_budget)
+        else:
+            pressure = 0.0
+
+        with self._lock:
+            self.latency = latency
+            self.pressure = pressure
+            previous = self.level
+
+            if pressure > 1.0:
+                self._calm_since = None
+                if self._hot_since is None:
+                    self._hot_since = now
+                if self.level < REFUSING and now - self._hot_since >= self.up_hold:
+                    self.level += 1
+                    # The next step needs its own hold
+                    self._hot_since = now
+            elif pressure < self.recover_ratio:
+                self._hot_since = None
+                if self._calm_since is None:
+                    self._calm_since = now
+                if self.level > NORMAL and now - self._calm_since >= self.down_hold:
+                    self.level -= 1
+                    self._calm_since = now
+            else:
+                self._hot_since = self._calm_since = None
+
+            if self.level != previous:
+                self._changed_at = now
+                print(f"Load shedding {LEVEL_NAMES[previous]} -> {LEVEL_NAMES[self.level]} "
+                      f"(pressure {pressure:.2f}, p95 wait {latency['p95_wait_ms']} ms, "
+                      f"p95 inference {latency['p95_process_ms']} ms)")
+
+    def plan(self, mode, source='client'):
+        """
+        Decide how a new session may run under the current load
+
+        Args:
+            mode: Mode the client asked for, 'video', 'landmarks' or 'counters'
+            source: Where the session's frames come from, 'client' or 'server'.
+                Only client sessions have a camera preview to draw landmarks
+                over, so only they are switched to landmarks; the rest are
+                reduced.
+
+        Returns:
+            (mode, levels): the mode to run in and the quality ladder to use,
+            None for the full ladder
+
+        Raises:
+            Overloaded: While new sessions are being refused
+        """
+        with self._lock:
+            level = self.level
+            if level >= REFUSING:
+                self.shed['refusing'] += 1
+                raise Overloaded("Server is under heavy load, try again shortly")
+            if level >= LANDMARKS_ONLY and mode == 'video' and source == 'client':
+                self.shed['landmarks_only'] += 1
+                mode = 'landmarks'
+            elif level >= REDUCED:
+                self.shed['reduced'] += 1
+
+        if level < REDUCED:
+            return mode, None
+        # The lower part of the quality ladder, at most max_fps
+        levels = quality_levels()
+        return mode, [settings for settings in levels if settings['fps'] <= self.max_fps] or levels[-1:]
+
+    def refusing(self):
+        """Whether new sessions are refused outright (for transports without a cheaper mode)"""
+        with self._lock:
+            if self.level >= REFUSING:
+                self.shed['refusing'] += 1
+                return True
+            return False
+
+    def stats(self):
+        """Return the shedding level, pressure and latency it is based on"""
+        with self._lock:
+            return {
+                'level': LEVEL_NAMES[self.level],
+                'pressure': round(self.pressure, 2),
+                'since_s': round(time.monotonic() - self._changed_at, 1),
+                'latency': dict(self.latency),
+                'budgets_ms': {'wait': self.wait_budget, 'process': self.process_budget},
+                'shed': dict(self.shed)
+            }
+
+
+_shedder = None
+_shedder_lock = threading.Lock()
+
+
+def get_load_shedder():
+    """Return the process-wide load shedder, starting its monitor on first use"""
+    global _shedder
+    if _shedder is None:
+        with _shedder_lock:
+            if _shedder is None:
+                _shedder = LoadShedder()
+    return _shedder
@@ -0,0 +1,181 @@
+import os
+import threading
+from collections import deque
+
+
+class MjpegSubscriber:
+    """
+    One viewer of a broadcast, holding at most ``max_queue`` pending parts
+
+    When the viewer reads slower than the producer, the oldest queued part
+    is dropped, so a slow client skips frames instead of building a backlog.
+    """
+
+    def __init__(self, broadcaster, max_queue):
+        self._broadcaster = broadcaster
+        self._queue = deque(maxlen=max_queue)
+        self._cv = threading.Condition()
+        self._ended = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def put(self, part):
+        with self._cv:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(part)
+            self._cv.notify()
+
+    def end(self):
+        with self._cv:
+            self._ended = True
+            self._cv.notify()
+
+    def frames(self):
+        """Yield MJPEG parts until the producer stops; unsubscribes when closed"""
+        try:
+            while True:
+                with self._cv:
+                    self._cv.wait_for(lambda: self._queue or self._ended)
+                    if not self._queue:
+                        return
+                    part = self._queue.popleft()
+                self.delivered += 1
+                yield part
+        finally:
+            self._broadcaster.unsubscribe(self)
+
+
+class MjpegBroadcaster:
+    """
+    Shares one exercise stream between any number of MJPEG viewers
+
+    A single producer thread runs the exercise generator (one camera, one
+    pose loop, one JPEG encode per frame) and hands every part to each
+    subscriber's queue. The producer starts with the first subscriber and
+    stops when the last one leaves, which closes the generator and
+    releases the camera.
+    """
+
+    def __init__(self, name, source_factory, max_queue=None):
+        self.name = name
+        self._source_factory = source_factory
+        self.max_queue = max_queue or int(os.environ.get('MJPEG_SUBSCRIBER_QUEUE', 2))
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._stopping = None
+        self.frames = 0
+
+    def subscribe(self):
+        """Add a viewer, starting the producer if it is not running"""
+        subscriber = MjpegSubscriber(self, self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._start()
+        return subscriber
+
+    def _start(self):
+        # A producer that is still shutting down must release the camera first
+        self._thread = threading.Thread(target=self._produce, args=(self._stopping,), daemon=True,
+                                        name=f"mjpeg-{self.name}")
+        self._thread.start()
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def running(self):
+        with self._lock:
+            return self._thread is not None
+
+    def _produce(self, previous):
+        if previous is not None:
+            previous.join()
+
+        print(f"MJPEG producer for {self.name} started")
+        source = self._source_factory()
+        idle = False
+        try:
+            for part in source:
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                if not subscribers:
+                    idle = True
+                    break
+                self.frames += 1
+                for subscriber in subscribers:
+                    subscriber.put(part)
+        except Exception as e:
+            print(f"Error in MJPEG producer for {self.name}: {e}")
+        finally:
+            with self._lock:
+                self._stopping = self._thread
+                self._thread = None
+                if idle and self._subscribers:
+                    # Viewers arrived while the last one was leaving, start over for them
+                    self._start()
+                    ended = []
+                else:
+                    # The stream itself ended (camera gone), close every viewer
+                    ended = list(self._subscribers)
+                    self._subscribers.clear()
+            source.close()
+            for subscriber in ended:
+                subscriber.end()
+            print(f"MJPEG producer for {self.name} stopped")
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            running = self._thread is not None
+        return {
+            'running': running,
+            'frames': self.frames,
+            'subscribers': len(subscribers),
+            'dropped': sum(subscriber.dropped for subscriber in subscribers)
+        }
+
+
+class MjpegHub:
+    """One broadcaster per exercise, created on first request"""
+
+    def __init__(self, source_factory):
+        self._source_factory = source_factory
+        self._lock = threading.Lock()
+        self._broadcasters = {}
+
+    def subscribe(self, name):
+        """
+        Subscribe to an exercise's stream
+
+        Args:
+            name: Exercise id, passed to the source factory
+
+        Returns:
+            MjpegSubscriber whose frames() generator feeds the response
+        """
+        with self._lock:
+            broadcaster = self._broadcasters.get(name)
+            if broadcaster is None:
+                broadcaster = MjpegBroadcaster(name, lambda: self._source_factory(name))
+                self._broadcasters[name] = broadcaster
+        return broadcaster.subscribe()
+
+    def running(self, name):
+        """Whether the exercise's producer is running, so a new viewer would not start one"""
+        with self._lock:
+            broadcaster = self._broadcasters.get(name)
+        return broadcaster is not None and broadcaster.running()
+
+    def producers(self):
+        """Number of running producers, each holding a pose instance like a session"""
+        with self._lock:
+            broadcasters = list(self._broadcasters.values())
+        return sum(1 for broadcaster in broadcasters if broadcaster.running())
+
+    def stats(self):
+        with self._lock:
+            broadcasters = dict(self._broadcasters)
+        return {name: broadcaster.stats() for name, broadcaster in broadcasters.items()}
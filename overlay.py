@@ -0,0 +1,125 @@
+"""
+Overlay compositor for the exercise HUD
+
+Feedback banners are blended only inside their own rectangle instead of
+copying and alpha-blending the whole frame, and static text (guidance
+lines, banner messages, status labels) is rendered once into an alpha
+sprite and composited into the frame on later draws.
+"""
+import functools
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class TextSprite:
+    """
+    Pre-rendered text with an anti-aliased alpha mask
+
+    Drawing composites the cached glyph pixels into the frame, which is
+    cheaper than rasterizing the Hershey strokes again on every frame.
+    """
+
+    def __init__(self, text, scale, color, thickness):
+        (width, height), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+        self.pad = thickness
+        self.ascent = height + self.pad
+        self.width = width + 2 * self.pad
+        self.height = height + baseline + 2 * self.pad
+
+        mask = np.zeros((self.height, self.width), dtype=np.uint8)
+        cv2.putText(mask, text, (self.pad, self.ascent), FONT, scale, 255, thickness, cv2.LINE_AA)
+
+        # Keep only the rows/columns the glyphs touch
+        ys, xs = np.nonzero(mask)
+        if len(xs):
+            self.x_offset, self.y_offset = int(xs.min()), int(ys.min())
+            mask = mask[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+        else:
+            self.x_offset = self.y_offset = 0
+
+        self.alpha = (mask.astype(np.float32) / 255.0)[:, :, None]
+        self.color = np.array(color, dtype=np.float32)
+
+    def draw(self, image, origin):
+        """
+        Composite the text into the image
+
+        Args:
+            image: BGR frame (modified in place)
+            origin: Bottom-left text origin, as for cv2.putText
+        """
+        x = origin[0] - self.pad + self.x_offset
+        y = origin[1] - self.ascent + self.y_offset
+        h, w = self.alpha.shape[:2]
+
+        # Clip against the frame edges
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, image.shape[1]), min(y + h, image.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        alpha = self.alpha[y0 - y:y1 - y, x0 - x:x1 - x]
+        roi = image[y0:y1, x0:x1]
+        roi[:] = (roi + (self.color - roi) * alpha).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=256)
+def text_sprite(text, scale, color, thickness):
+    """Return the cached sprite for a piece of static text"""
+    return TextSprite(text, scale, tuple(color), thickness)
+
+
+def draw_static_text(image, text, origin, scale, color, thickness):
+    """Draw text that repeats across frames through the sprite cache"""
+    text_sprite(text, scale, tuple(color), thickness).draw(image, origin)
+
+
+def blend_rect(image, top_left, bottom_right, color=(0, 0, 0), alpha=0.5):
+    """
+    Alpha-blend a solid rectangle into the image, touching only that rectangle
+
+    Args:
+        image: BGR frame (modified in place)
+        top_left: (x, y) corner
+        bottom_right: (x, y) corner
+        color: BGR fill color
+        alpha: Opacity of the fill
+    """
+    x0, y0 = max(top_left[0], 0), max(top_left[1], 0)
+    x1, y1 = min(bottom_right[0], image.shape[1]), min(bottom_right[1], image.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    roi = image[y0:y1, x0:x1]
+    if color == (0, 0, 0):
+        roi[:] = cv2.convertScaleAbs(roi, alpha=1 - alpha)
+    else:
+        fill = np.empty_like(roi)
+        fill[:] = color
+        roi[:] = cv2.addWeighted(roi, 1 - alpha, fill, alpha, 0)
+
+
+def draw_banner(image, text, position='center', scale=1, color=(0, 0, 255), alpha=0.5):
+    """
+    Draw a feedback message on a translucent black strip
+
+    Args:
+        image: BGR frame (modified in place)
+        text: Message to show
+        position: 'center' of the frame or 'bottom'
+        scale: Font scale
+        color: Text color
+        alpha: Opacity of the background strip
+    """
+    text_size = cv2.getTextSize(text, FONT, scale, 2)[0]
+    text_x = (image.shape[1] - text_size[0]) // 2
+    text_y = image.shape[0] - 50 if position == 'bottom' else image.shape[0] // 2
+
+    blend_rect(image,
+               (text_x - 10, text_y - text_size[1] - 10),
+               (text_x + text_size[0] + 10, text_y + 10),
+               alpha=alpha)
+    draw_static_text(image, text, (text_x, text_y), scale, color, 2)
@@ -0,0 +1,151 @@
+import os
+import queue
+import threading
+import uuid
+from contextlib import contextmanager
+
+from utils import create_pose
+from session_store import worker_count
+from pose_workers import ProcessPosePool, pose_worker_processes
+
+
+class PosePoolExhausted(RuntimeError):
+    """Raised when no pose instance becomes free before the checkout timeout"""
+
+
+def worker_cpus():
+    """CPU cores available to this process when WEB_CONCURRENCY workers share the host"""
+    return max(1, (os.cpu_count() or 1) // worker_count())
+
+
+def default_pool_size():
+    """
+    Work out how many pose instances to pre-build
+
+    POSE_POOL_SIZE wins if set, otherwise POSE_POOL_PER_CPU (default 1)
+    instances are built for every CPU core this worker process gets.
+
+    Returns:
+        Number of pose instances for the pool
+    """
+    if os.environ.get('POSE_POOL_SIZE'):
+        return max(1, int(os.environ['POSE_POOL_SIZE']))
+
+    per_cpu = float(os.environ.get('POSE_POOL_PER_CPU', 1))
+    return max(1, int(worker_cpus() * per_cpu))
+
+
+class PosePool:
+    """
+    Pool of pre-built mediapipe Pose instances with per-session affinity
+
+    A session keeps the same instance from its first checkout until it is
+    released, so the tracking state inside the pose graph always belongs to
+    one athlete. Released instances are reset before another session gets them.
+    """
+
+    def __init__(self, size=None, factory=create_pose):
+        self.size = size or default_pool_size()
+        # LIFO so the most recently used (warm) instance is handed out first
+        self._idle = queue.LifoQueue()
+        self._assigned = {}
+        self._lock = threading.Lock()
+
+        for _ in range(self.size):
+            self._idle.put(factory())
+
+        print(f"Pose pool ready with {self.size} instances")
+
+    def acquire(self, session_id, timeout=None):
+        """
+        Check out the pose instance bound to a session
+
+        Args:
+            session_id: Session the instance belongs to
+            timeout: Seconds to wait for a free instance (None waits forever)
+
+        Returns:
+            Pose instance reserved for this session
+        """
+        with self._lock:
+            instance = self._assigned.get(session_id)
+            if instance is not None:
+                return instance
+
+        try:
+            instance = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PosePoolExhausted(f"No pose instance free after {timeout}s for session {session_id}")
+
+        with self._lock:
+            # Another thread may have bound the session while we were waiting
+            existing = self._assigned.get(session_id)
+            if existing is not None:
+                self._idle.put(instance)
+                return existing
+            self._assigned[session_id] = instance
+
+        return instance
+
+    def release(self, session_id):
+        """
+        Return a session's pose instance to the pool
+
+        Args:
+            session_id: Session whose instance should be returned
+        """
+        with self._lock:
+            instance = self._assigned.pop(session_id, None)
+
+        if instance is None:
+            return
+
+        # Drop the tracking state so the next session starts with a fresh detection
+        instance.reset()
+        self._idle.put(instance)
+
+    @contextmanager
+    def session(self, session_id=None, timeout=None):
+        """
+        Context manager that checks out a pose instance for the duration of a block
+
+        Args:
+            session_id: Session to bind (a random id is used if omitted)
+            timeout: Seconds to wait for a free instance
+        """
+        session_id = session_id or uuid.uuid4().hex
+        instance = self.acquire(session_id, timeout)
+        try:
+            yield instance
+        finally:
+            self.release(session_id)
+
+    def stats(self):
+        """Return pool utilisation for diagnostics"""
+        with self._lock:
+            in_use = len(self._assigned)
+        return {
+            'size': self.size,
+            'in_use': in_use,
+            'idle': self.size - in_use
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pose_pool():
+    """
+    Return the process-wide pose pool, building it on first use
+
+    With POSE_WORKER_PROCESSES set the instances live in worker processes
+    (pose_workers.ProcessPosePool), otherwise in this process.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPosePool() if pose_worker_processes() else PosePool()
+    return _pool
+
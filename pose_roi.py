@@ -0,0 +1,111 @@
+import os
+
+import cv2
+import numpy as np
+
+# Landmarks below this visibility do not shape the bounding box
+VISIBILITY_THRESHOLD = 0.5
+
+
+class PoseRoi:
+    """
+    Crops and downscales pose input around the body found in the previous frame
+
+    The bounding box of the previous frame's landmarks, padded by ``margin``
+    and squared up, is cut out and resized so its longest side is
+    ``input_size`` pixels. Without previous landmarks the whole frame is
+    used, downscaled to ``full_frame_size``. Landmarks detected on the
+    smaller image are mapped back to normalized full-frame coordinates, so
+    callers never see the crop.
+    """
+
+    def __init__(self, input_size=None, full_frame_size=None, margin=None):
+        self.input_size = input_size or int(os.environ.get('POSE_ROI_SIZE', 256))
+        self.full_frame_size = full_frame_size or int(os.environ.get('POSE_FULL_FRAME_SIZE', 640))
+        self.margin = margin if margin is not None else float(os.environ.get('POSE_ROI_MARGIN', 0.25))
+
+    def bounding_box(self, landmarks, image_shape):
+        """
+        Padded, square pixel box around the landmarks
+
+        Args:
+            landmarks: (33, 4) landmark array in normalized coordinates
+            image_shape: Shape of the full frame
+
+        Returns:
+            (x0, y0, x1, y1) pixel box clipped to the frame, or None if it is degenerate
+        """
+        h, w = image_shape[:2]
+        visible = landmarks[:, 3] > VISIBILITY_THRESHOLD
+        points = landmarks[visible if visible.sum() >= 2 else slice(None), :2]
+        points = np.clip(points, 0.0, 1.0) * (w, h)
+
+        (x0, y0), (x1, y1) = points.min(axis=0), points.max(axis=0)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        half = max(x1 - x0, y1 - y0) * (0.5 + self.margin)
+
+        box = (
+            int(max(0, cx - half)),
+            int(max(0, cy - half)),
+            int(min(w, cx + half)),
+            int(min(h, cy + half))
+        )
+        if box[2] - box[0] < 16 or box[3] - box[1] < 16:
+            return None
+        return box
+
+    def prepare(self, image, landmarks=None):
+        """
+        Build the inference input for a frame
+
+        Args:
+            image: Full RGB frame
+            landmarks: Previous frame's landmarks, or None to use the full frame
+
+        Returns:
+            Tuple of (input image, box) where box is the (x0, y0, x1, y1) region it covers
+        """
+        h, w = image.shape[:2]
+        box = self.bounding_box(landmarks, image.shape) if landmarks is not None else None
+        if box is None:
+            box = (0, 0, w, h)
+            target = self.full_frame_size
+        else:
+            target = self.input_size
+
+        x0, y0, x1, y1 = box
+        region = image[y0:y1, x0:x1]
+        scale = target / max(x1 - x0, y1 - y0)
+        if scale < 1:
+            region = cv2.resize(region, (max(1, int((x1 - x0) * scale)), max(1, int((y1 - y0) * scale))),
+                                interpolation=cv2.INTER_AREA)
+        else:
+            # mediapipe wants a contiguous buffer, not a strided view
+            region = np.ascontiguousarray(region)
+        return region, box
+
+    @staticmethod
+    def is_full_frame(box, image_shape):
+        return box == (0, 0, image_shape[1], image_shape[0])
+
+    @staticmethod
+    def to_frame(landmarks, box, image_shape):
+        """
+        Map landmarks detected on a cropped input back to full-frame coordinates
+
+        Args:
+            landmarks: (33, 4) landmark array normalized to the crop
+            box: (x0, y0, x1, y1) region the crop came from
+            image_shape: Shape of the full frame
+
+        Returns:
+            The same array, rewritten in normalized full-frame coordinates
+        """
+        h, w = image_shape[:2]
+        x0, y0, x1, y1 = box
+        scale_x = (x1 - x0) / w
+        landmarks[:, 0] = landmarks[:, 0] * scale_x + x0 / w
+        landmarks[:, 1] = landmarks[:, 1] * ((y1 - y0) / h) + y0 / h
+        # mediapipe scales z like x
+        landmarks[:, 2] *= scale_x
+        return landmarks
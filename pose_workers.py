@@ -0,0 +1,396 @@
+"""
+Pose inference in worker processes fed through shared memory
+
+MediaPipe inference in the web process competes for the GIL with Socket.IO
+and JSON work. With POSE_WORKER_PROCESSES set, every pose instance lives
+in one of a pool of worker processes instead. Each worker owns a
+shared-memory block of frame slots followed by one landmark result per
+slot: the web process copies a frame straight into a free slot and puts
+only a small descriptor (slot, sequence number, session, shape) on the
+worker's request queue, the worker writes the 33 landmarks back into the
+slot's result area and answers with another small descriptor on its own
+result pipe. Frames are never pickled.
+
+Sessions stay on the worker they were first assigned to, so the tracking
+state of their pose instance carries from frame to frame just as with the
+in-process PosePool.
+"""
+import os
+import math
+import time
+import atexit
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+from utils import create_pose, landmarks_to_array, NUM_LANDMARKS
+from session_store import worker_count
+from cooperative import offload, wait_readable
+
+# x, y, z and visibility per landmark, as float32
+LANDMARK_FIELDS = 4
+RESULT_BYTES = NUM_LANDMARKS * LANDMARK_FIELDS * 4
+
+
+class PoseWorkerTimeout(RuntimeError):
+    """Raised when a pose worker process does not answer in time"""
+
+
+def pose_worker_processes():
+    """
+    Number of pose worker processes to run, 0 keeps inference in the web process
+
+    POSE_WORKER_PROCESSES is a count, or 'auto' for one per CPU core this
+    web worker gets.
+    """
+    value = os.environ.get('POSE_WORKER_PROCESSES', '0').strip().lower()
+    if value == 'auto':
+        return max(1, (os.cpu_count() or 1) // worker_count())
+    return max(0, int(value or 0))
+
+
+def _result_area(buffer, slots, slot_bytes):
+    return np.ndarray((slots, NUM_LANDMARKS, LANDMARK_FIELDS), np.float32, buffer=buffer,
+                      offset=slots * slot_bytes)
+
+
+def _run_frame(buffer, slot, slot_bytes, shape, pose, results_area):
+    """Run one frame from its slot, returns whether a pose was found"""
+    frame = np.ndarray(shape, np.uint8, buffer=buffer, offset=slot * slot_bytes)
+    landmarks = pose.process(frame).pose_landmarks
+    if landmarks is None:
+        return False
+    results_area[slot] = landmarks_to_array(landmarks)
+    return True
+
+
+def _serve(shm_name, slots, slot_bytes, factory, requests, results):
+    """Worker process main loop: frames from the shared slots on per-session pose instances"""
+    # Spawned children share the web process's resource tracker, which
+    # unlinks the block should the web process die without closing the pool
+    shm = shared_memory.SharedMemory(name=shm_name)
+    results_area = _result_area(shm.buf, slots, slot_bytes)
+    poses = {}
+    idle = []
+
+    try:
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+
+            if message[0] == 'release':
+                pose = poses.pop(message[1], None)
+                if pose is not None:
+                    # Drop the tracking state before another session gets the instance
+                    pose.reset()
+                    idle.append(pose)
+                continue
+
+            _, slot, seq, session_id, shape = message
+            started = time.perf_counter()
+            try:
+                pose = poses.get(session_id)
+                if pose is None:
+                    pose = poses[session_id] = idle.pop() if idle else factory()
+                found = _run_frame(shm.buf, slot, slot_bytes, shape, pose, results_area)
+                results.send((slot, seq, found, time.perf_counter() - started, None))
+            except Exception as e:
+                results.send((slot, seq, False, time.perf_counter() - started, str(e)))
+    finally:
+        del results_area
+        shm.close()
+        results.close()
+
+
+class PoseWorker:
+    """
+    One pose worker process and its shared-memory frame slots
+
+    At most ``slots`` frames are in flight; callers wait for a free slot.
+    A slot is handed back only once the worker has answered for it, so a
+    late answer can never land on top of a newer frame.
+
+    Answers come back over a pipe only this worker writes to, read by its
+    own collector thread, so terminating one worker cannot corrupt or lock
+    another's results.
+    """
+
+    def __init__(self, index, context, slots, slot_bytes, factory):
+        self.index = index
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._context = context
+        self._factory = factory
+        self._closing = False
+
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * (slot_bytes + RESULT_BYTES))
+        self._results_area = _result_area(self.shm.buf, slots, slot_bytes)
+        self._cv = threading.Condition()
+        self._free = deque(range(slots))
+        self._pending = {}  # slot -> {'seq', 'done', 'landmarks', 'error'}
+        self._seq = 0
+
+        self.sessions = set()
+        self.processed = 0
+        self.avg_ms = 0.0
+        self.errors = 0
+        self.restarts = 0
+        self._start()
+
+    def _start(self):
+        self.requests = self._context.Queue()
+        results, sender = self._context.Pipe(duplex=False)
+        self.process = self._context.Process(
+            target=_serve,
+            args=(self.shm.name, self.slots, self.slot_bytes, self._factory, self.requests, sender),
+            name=f"pose-worker-{self.index}",
+            daemon=True
+        )
+        self.process.start()
+        # Only the child writes, so the pipe reports EOF once it exits
+        sender.close()
+        collector = threading.Thread(target=self._collect, args=(self.process, results), daemon=True,
+                                     name=f"pose-results-{self.index}")
+        collector.start()
+
+    def _collect(self, process, results):
+        """Take one worker process's answers until its end of the pipe closes"""
+        try:
+            while True:
+                wait_readable(results.fileno())
+                try:
+                    self.complete(*results.recv())
+                except (EOFError, OSError):
+                    break
+                except Exception as e:
+                    print(f"Bad answer from pose worker {self.index}: {e}")
+        finally:
+            results.close()
+
+        if not self._closing and process is self.process:
+            # Died on its own: fail its frames now rather than at their timeout
+            offload(process.join, 1)
+            self.restart()
+
+    def infer(self, session_id, image, timeout):
+        """
+        Run one frame on the session's pose instance in the worker process
+
+        Returns:
+            (33, 4) float32 landmarks, or None when no pose was found
+
+        Raises:
+            PoseWorkerTimeout: If no slot frees up or the worker does not answer in time
+        """
+        if not self.process.is_alive():
+            self.restart()
+
+        if image.nbytes > self.slot_bytes:
+            # Landmarks are normalised, so a smaller frame gives the same coordinates
+            scale = math.sqrt(self.slot_bytes / image.nbytes)
+            image = cv2.resize(image, (int(image.shape[1] * scale), int(image.shape[0] * scale)),
+                               interpolation=cv2.INTER_AREA)
+
+        with self._cv:
+            slot = self._free.popleft() if self._cv.wait_for(lambda: self._free, timeout) else None
+            if slot is not None:
+                self._seq += 1
+                pending = self._pending[slot] = {'seq': self._seq, 'done': threading.Event(), 'sent': time.monotonic(),
+                                                 'landmarks': None, 'error': None}
+        if slot is None:
+            self._unstick(timeout)
+            raise PoseWorkerTimeout(f"No free frame slot on pose worker {self.index} after {timeout}s")
+
+        np.copyto(np.ndarray(image.shape, np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes), image)
+        self.requests.put(('process', slot, pending['seq'], session_id, image.shape))
+
+        if not pending['done'].wait(timeout):
+            self._unstick(timeout)
+            raise PoseWorkerTimeout(f"Pose worker {self.index} did not answer after {timeout}s")
+        if pending['error'] is not None:
+            raise RuntimeError(f"Pose worker {self.index}: {pending['error']}")
+        return pending['landmarks']
+
+    def complete(self, slot, seq, found, elapsed, error):
+        """Take a worker's answer for a slot (called by the pool's result collector)"""
+        with self._cv:
+            pending = self._pending.get(slot)
+            if pending is None or pending['seq'] != seq:
+                return
+            del self._pending[slot]
+            if found:
+                # Copied out before the slot can be reused
+                pending['landmarks'] = self._results_area[slot].copy()
+            pending['error'] = error
+            self.processed += 1
+            if error is not None:
+                self.errors += 1
+            self.avg_ms = 0.9 * self.avg_ms + 0.1 * elapsed * 1000 if self.processed > 1 else elapsed * 1000
+            self._free.append(slot)
+            self._cv.notify()
+        pending['done'].set()
+
+    def release(self, session_id):
+        self.sessions.discard(session_id)
+        self.requests.put(('release', session_id))
+
+    def _unstick(self, timeout):
+        """
+        Reclaim the slots of a worker that has held a frame for ``timeout`` seconds
+
+        A slot the worker may still be reading cannot be handed to a new
+        frame, so a hung worker is replaced, which frees all its slots.
+        """
+        with self._cv:
+            oldest = min((pending['sent'] for pending in self._pending.values()), default=None)
+        if oldest is None or time.monotonic() - oldest < timeout:
+            return
+        if self.process.is_alive():
+            print(f"Pose worker {self.index} has not answered for {timeout}s, replacing it")
+            self.process.terminate()
+            offload(self.process.join, 1)
+        self.restart()
+
+    def restart(self):
+        """Replace a dead worker process; frames it held fail and its sessions start fresh"""
+        with self._cv:
+            if self.process.is_alive():
+                return
+            print(f"Pose worker {self.index} died (exit code {self.process.exitcode}), restarting")
+            failed = list(self._pending.values())
+            self._pending.clear()
+            self._free = deque(range(self.slots))
+            self.restarts += 1
+            self.requests.close()
+            self._start()
+            self._cv.notify_all()
+        for pending in failed:
+            pending['error'] = 'worker process died'
+            pending['done'].set()
+
+    def close(self):
+        self._closing = True
+        if self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        # Views into the block must go before it can be closed
+        self._results_area = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def stats(self):
+        with self._cv:
+            return {
+                'pid': self.process.pid,
+                'alive': self.process.is_alive(),
+                'sessions': len(self.sessions),
+                'in_flight': self.slots - len(self._free),
+                'processed': self.processed,
+                'avg_ms': round(self.avg_ms, 1),
+                'errors': self.errors,
+                'restarts': self.restarts
+            }
+
+
+class RemotePose:
+    """
+    Stand-in for a mediapipe Pose whose ``process`` runs in a worker process
+
+    Waiting for the worker is cooperative, so the inference scheduler calls
+    it directly rather than offloading it to a native thread. The result's
+    ``pose_landmarks`` is the (33, 4) array read from shared memory, not a
+    NormalizedLandmarkList, so it goes to the estimator without a protobuf
+    round trip.
+    """
+
+    def __init__(self, worker, session_id, timeout):
+        self.worker = worker
+        self.session_id = session_id
+        self.timeout = timeout
+
+    def process(self, image):
+        landmarks = self.worker.infer(self.session_id, image, self.timeout)
+        return SimpleNamespace(pose_landmarks=landmarks)
+
+
+class ProcessPosePool:
+    """
+    Drop-in replacement for PosePool that keeps pose instances in worker processes
+
+    Sessions are spread over the workers by how many sessions each already
+    has and keep their worker until released.
+    """
+
+    def __init__(self, processes=None, slots=None, slot_bytes=None, factory=create_pose, timeout=None):
+        self.processes = processes or pose_worker_processes() or 1
+        slots = slots or int(os.environ.get('POSE_WORKER_SLOTS', 2))
+        slot_bytes = slot_bytes or int(os.environ.get('POSE_WORKER_FRAME_BYTES', 1280 * 720 * 3))
+        self.timeout = timeout or float(os.environ.get('POSE_WORKER_TIMEOUT', 5))
+        # Frames that can be in flight at once across all workers
+        self.size = self.processes * slots
+
+        # Spawned, not forked: the web process is monkey-patched and runs threads
+        context = multiprocessing.get_context('spawn')
+        self._workers = [PoseWorker(index, context, slots, slot_bytes, factory)
+                         for index in range(self.processes)]
+        self._lock = threading.Lock()
+        self._assigned = {}
+        atexit.register(self.close)
+
+        print(f"Pose worker pool ready with {self.processes} processes, {slots} frame slots each")
+
+    def acquire(self, session_id, timeout=None):
+        """
+        Bind a session to a worker process
+
+        Args:
+            session_id: Session the pose instance belongs to
+            timeout: Unused, workers create instances on demand
+
+        Returns:
+            RemotePose for the session
+        """
+        with self._lock:
+            worker = self._assigned.get(session_id)
+            if worker is None:
+                worker = min(self._workers, key=lambda candidate: len(candidate.sessions))
+                worker.sessions.add(session_id)
+                self._assigned[session_id] = worker
+        return RemotePose(worker, session_id, self.timeout)
+
+    def release(self, session_id):
+        """Hand a session's pose instance back to its worker's idle list"""
+        with self._lock:
+            worker = self._assigned.pop(session_id, None)
+        if worker is not None:
+            worker.release(session_id)
+
+    def close(self):
+        """Stop the worker processes and free their shared memory"""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            try:
+                worker.close()
+            except Exception as e:
+                print(f"Error stopping pose worker {worker.index}: {e}")
+
+    def stats(self):
+        """Return frame slot utilisation and per-process counters for diagnostics"""
+        with self._lock:
+            sessions = len(self._assigned)
+        processes = [worker.stats() for worker in self._workers]
+        in_use = sum(process['in_flight'] for process in processes)
+        return {
+            'size': self.size,
+            'in_use': in_use,
+            'idle': self.size - in_use,
+            'sessions': sessions,
+            'processes': processes
+        }
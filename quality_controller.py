@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Unacknowledged frames older than this count as lost
+ACK_TIMEOUT = 2.0
+# Consecutive sends with a growing backlog that count as congestion
+GROWTH_LIMIT = 3
+
+
+def quality_levels(steps=None):
+    """
+    Output settings from best to worst, interpolated between the configured bounds
+
+    Bounds come from QUALITY_MAX/MIN_SCALE, QUALITY_MAX/MIN_JPEG and
+    QUALITY_MAX/MIN_FPS; QUALITY_STEPS sets how many levels lie between them.
+
+    Returns:
+        List of {'scale', 'quality', 'fps'} dicts, index 0 the best
+    """
+    steps = steps or int(os.environ.get('QUALITY_STEPS', 5))
+    bounds = {
+        'scale': (float(os.environ.get('QUALITY_MAX_SCALE', 1.0)), float(os.environ.get('QUALITY_MIN_SCALE', 0.5))),
+        'quality': (int(os.environ.get('QUALITY_MAX_JPEG', 80)), int(os.environ.get('QUALITY_MIN_JPEG', 40))),
+        'fps': (float(os.environ.get('QUALITY_MAX_FPS', 30)), float(os.environ.get('QUALITY_MIN_FPS', 8))),
+    }
+
+    levels = []
+    for step in range(steps):
+        t = step / (steps - 1) if steps > 1 else 0.0
+        levels.append({
+            'scale': round(bounds['scale'][0] + (bounds['scale'][1] - bounds['scale'][0]) * t, 2),
+            'quality': int(round(bounds['quality'][0] + (bounds['quality'][1] - bounds['quality'][0]) * t)),
+            'fps': round(bounds['fps'][0] + (bounds['fps'][1] - bounds['fps'][0]) * t, 1),
+        })
+    return levels
+
+
+class QualityController:
+    """
+    Per-session output quality driven by how well the client keeps up
+
+    Every emitted frame gets an id that the client acknowledges once it has
+    rendered the frame. The controller tracks a smoothed round-trip time
+    and the number of unacknowledged frames (what is sitting in the socket
+    send buffer or the browser's queue). It steps down one level as soon as
+    either grows past its limit, and steps back up only after the link has
+    stayed healthy for ``up_hold`` seconds. The level's fps is applied by
+    the caller's FramePacer; while the backlog is full ``ready`` returns
+    False and the caller skips drawing and encoding the frame altogether.
+    """
+
+    def __init__(self, levels=None, target_rtt=None, max_backlog=None, down_hold=0.5, up_hold=3.0):
+        self.levels = levels or quality_levels()
+        self.target_rtt = target_rtt or float(os.environ.get('QUALITY_TARGET_RTT_MS', 200))
+        self.max_backlog = max_backlog or int(os.environ.get('QUALITY_MAX_BACKLOG', 3))
+        self.down_hold = down_hold
+        self.up_hold = up_hold
+
+        self._lock = threading.Lock()
+        self._unacked = OrderedDict()  # frame id -> sent time
+        self._next_id = 0
+        self._growth = 0
+        self._last_change = time.monotonic()
+
+        self.level = 0
+        self.rtt = None
+        self.sent = 0
+        self.acked = 0
+        self.lost = 0
+        self.skipped = 0
+
+    def settings(self):
+        """Current {'scale', 'quality', 'fps'}"""
+        return self.levels[self.level]
+
+    def ready(self):
+        """Whether the next frame should be rendered and sent"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if len(self._unacked) >= self.max_backlog:
+                self.skipped += 1
+                return False
+            return True
+
+    def on_sent(self):
+        """
+        Record a frame going out
+
+        Returns:
+            Frame id the client should acknowledge
+        """
+        now = time.monotonic()
+        with self._lock:
+            backlog = len(self._unacked)
+            frame_id = self._next_id
+            self._next_id += 1
+            self._unacked[frame_id] = now
+            self.sent += 1
+
+            self._growth = self._growth + 1 if len(self._unacked) > backlog and backlog > 0 else 0
+            self._adjust(now)
+            return frame_id
+
+    def on_ack(self, frame_id):
+        """Record the client's acknowledgement of a rendered frame"""
+        now = time.monotonic()
+        with self._lock:
+            sent_at = self._unacked.pop(frame_id, None)
+            if sent_at is None:
+                return
+            # Everything sent before this frame was skipped by the client
+            while self._unacked and next(iter(self._unacked)) < frame_id:
+                self._unacked.popitem(last=False)
+                self.lost += 1
+
+            sample = (now - sent_at) * 1000
+            self.rtt = sample if self.rtt is None else 0.8 * self.rtt + 0.2 * sample
+            self.acked += 1
+            self._growth = 0
+            self._adjust(now)
+
+    def _expire(self, now):
+        while self._unacked and now - next(iter(self._unacked.values())) > ACK_TIMEOUT:
+            self._unacked.popitem(last=False)
+            self.lost += 1
+            # A lost frame means the link is worse than the RTT says
+            self._growth = GROWTH_LIMIT
+
+    def _adjust(self, now):
+        backlog = len(self._unacked)
+        congested = (backlog >= self.max_backlog
+                     or self._growth >= GROWTH_LIMIT
+                     or (self.rtt is not None and self.rtt > self.target_rtt * 1.5))
+        healthy = backlog <= 1 and self.rtt is not None and self.rtt < self.target_rtt * 0.5
+
+        if congested and self.level < len(self.levels) - 1 and now - self._last_change >= self.down_hold:
+            self.level += 1
+            self._last_change = now
+            self._growth = 0
+        elif healthy and self.level > 0 and now - self._last_change >= self.up_hold:
+            self.level -= 1
+            self._last_change = now
+
+    def stats(self):
+        """Return the controller state for diagnostics"""
+        with self._lock:
+            return {
+                'level': self.level,
+                'settings': self.levels[self.level],
+                'rtt_ms': round(self.rtt, 1) if self.rtt is not None else None,
+                'backlog': len(self._unacked),
+                'sent': self.sent,
+                'acked': self.acked,
+                'lost': self.lost,
+                'skipped': self.skipped
+            }
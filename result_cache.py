@@ -0,0 +1,182 @@
+import json
+import time
+import threading
+
+from session_store import get_store_client, store_key, store_ttl, wait_for_publish
+
+
+class ResultCache:
+    """
+    Latest exercise result per session, versioned for long polling
+
+    The frame loop publishes each session's counters and feedback here
+    whenever they change. Readers pass the version they already have and block until a
+    newer one is published or their timeout runs out, so HTTP clients get
+    every update as soon as it exists without polling on a timer.
+    """
+
+    def __init__(self):
+        self._cv = threading.Condition()
+        self._entries = {}      # key -> (version, data)
+        self._last_read = {}    # key -> monotonic time of the last read
+
+    def publish(self, key, data):
+        """
+        Store a new result and wake up waiting readers
+
+        Returns:
+            The new version number
+        """
+        with self._cv:
+            version = self._entries[key][0] + 1 if key in self._entries else 1
+            self._entries[key] = (version, data)
+            self._last_read.setdefault(key, time.monotonic())
+            self._cv.notify_all()
+            return version
+
+    def _mark_read(self, key):
+        # Unknown or finished sessions are not remembered
+        if key in self._entries:
+            self._last_read[key] = time.monotonic()
+
+    def get(self, key):
+        """(version, data) for a session, or None if it has no entry"""
+        with self._cv:
+            self._mark_read(key)
+            return self._entries.get(key)
+
+    def wait(self, key, since, timeout):
+        """
+        Wait for a result newer than ``since``
+
+        Args:
+            key: Session id
+            since: Version the caller already has (0 for none)
+            timeout: Seconds to wait at most
+
+        Returns:
+            (version, data) of the newer result, the unchanged current entry
+            on timeout, or None once the session is gone
+        """
+        with self._cv:
+            self._cv.wait_for(lambda: key not in self._entries or self._entries[key][0] > since, timeout)
+            self._mark_read(key)
+            return self._entries.get(key)
+
+    def idle(self, key):
+        """Seconds since anyone last read the session's result"""
+        with self._cv:
+            last_read = self._last_read.get(key)
+        return time.monotonic() - last_read if last_read is not None else 0.0
+
+    def touch(self, key):
+        """Keep a running session's entry alive between publishes (no-op in memory)"""
+
+    def reserve(self, key):
+        """Create an empty entry so readers can wait before the first result"""
+        with self._cv:
+            self._entries.setdefault(key, (0, None))
+            self._last_read[key] = time.monotonic()
+
+    def discard(self, key):
+        """Drop a finished session and release its waiting readers"""
+        with self._cv:
+            self._entries.pop(key, None)
+            self._last_read.pop(key, None)
+            self._cv.notify_all()
+
+
+class RedisResultCache:
+    """
+    ResultCache kept in Redis so any worker process can answer a long poll
+
+    Each session is a hash of version, data and last read time (wall clock,
+    since readers and the publisher may be different processes). Publishing
+    notifies the session's channel, which is what waiting readers block on.
+    """
+
+    def __init__(self, client, ttl=None):
+        self._client = client
+        self.ttl = ttl or store_ttl()
+        self._refreshed = {}
+
+    def _entry(self, name):
+        version, data = self._client.hmget(name, 'version', 'data')
+        return (int(version), json.loads(data)) if version is not None else None
+
+    def _mark_read(self, name):
+        pipe = self._client.pipeline()
+        pipe.hset(name, 'read', time.time())
+        pipe.expire(name, self.ttl)
+        pipe.execute()
+
+    def publish(self, key, data):
+        name = store_key('result', key)
+        pipe = self._client.pipeline()
+        pipe.hincrby(name, 'version', 1)
+        pipe.hset(name, 'data', json.dumps(data))
+        pipe.hsetnx(name, 'read', time.time())
+        pipe.expire(name, self.ttl)
+        pipe.publish(name, '')
+        self._refreshed[key] = time.monotonic()
+        return pipe.execute()[0]
+
+    def get(self, key):
+        name = store_key('result', key)
+        entry = self._entry(name)
+        if entry is not None:
+            self._mark_read(name)
+        return entry
+
+    def wait(self, key, since, timeout):
+        name = store_key('result', key)
+
+        def newer():
+            version = self._client.hget(name, 'version')
+            return version is None or int(version) > since
+
+        wait_for_publish(self._client, name, newer, timeout)
+        return self.get(key)
+
+    def idle(self, key):
+        last_read = self._client.hget(store_key('result', key), 'read')
+        return time.time() - float(last_read) if last_read is not None else 0.0
+
+    def touch(self, key):
+        # Called every frame, only goes to Redis a few times per ttl
+        now = time.monotonic()
+        if now - self._refreshed.get(key, 0) >= self.ttl / 3:
+            self._client.expire(store_key('result', key), self.ttl)
+            self._refreshed[key] = now
+
+    def reserve(self, key):
+        name = store_key('result', key)
+        pipe = self._client.pipeline()
+        pipe.hsetnx(name, 'version', 0)
+        pipe.hsetnx(name, 'data', 'null')
+        pipe.hset(name, 'read', time.time())
+        pipe.expire(name, self.ttl)
+        pipe.execute()
+
+    def discard(self, key):
+        self._refreshed.pop(key, None)
+        name = store_key('result', key)
+        pipe = self._client.pipeline()
+        pipe.delete(name)
+        pipe.publish(name, '')
+        pipe.execute()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the result cache, in Redis when a store is configured, creating it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                client = get_store_client()
+                _cache = RedisResultCache(client) if client is not None else ResultCache()
+    return _cache
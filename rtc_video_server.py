@@ -1,166 +1,276 @@
 import json
-import cv2
+import time
+import queue
+import uuid
 import asyncio
 import threading
-import numpy as np
-import mediapipe as mp
-from utils import calculate_angle, mp_pose, pose
-import asyncio
 
-# Dictionary to store active video processors
-video_processors = {}
-
-# Function to process WebRTC offer and setup connection
-async def process_offer(offer_data):
-    sdp = offer_data.get('sdp')
-    video_type = offer_data.get('exercise', 'default')
-    
-    # Create a proper WebRTC answer
-    # Note: In a real WebRTC implementation, we would process the offer SDP
-    # and create a real answer. This is a simplified version.
-    response = {
-        'sdp': {
-            'type': 'answer',
-            'sdp': sdp.get('sdp')  # Properly extract SDP from the offer
-        },
-        'ice_candidates': [
-            # Example ICE candidates - in real implementation these would be dynamic
-            {'candidate': 'candidate:1 1 UDP 2130706431 192.168.1.1 8888 typ host', 'sdpMLineIndex': 0}
-        ]
-    }
-    
-    # Start a new video processing thread for this connection
-    if video_type not in video_processors:
-        # Start appropriate video processor based on exercise type
-        await start_video_processor(video_type)
-    
-    return response
-
-async def start_video_processor(exercise_type):
-    """
-    Start a new thread to process video for the given exercise type
-    
-    Args:
-        exercise_type: Type of exercise to track
-    """
-    processor_thread = threading.Thread(target=await video_processor_worker(exercise_type))
-    processor_thread.daemon = True
-    processor_thread.start()
-    video_processors[exercise_type] = processor_thread
-    print(f"Started video processor for {exercise_type}")
+import cv2
+from av import VideoFrame
+from aiortc import RTCPeerConnection, RTCSessionDescription, MediaStreamTrack
+from aiortc.mediastreams import MediaStreamError
+
+from utils import create_pose
+from adaptive_pose import AdaptivePoseEstimator
+from exercises.engine import ExerciseTracker, draw_frame
+from cooperative import native_thread, native_queue, offload
+
+# Open peer connections by session id
+peer_connections = {}
+
 
-async def video_processor_worker(exercise_type):
+class ExerciseVideoTrack(MediaStreamTrack):
     """
-    Worker function that processes the video from the WebRTC connection.
-    
-    Args:
-        exercise_type: Type of exercise to track
+    Video track that runs the exercise engine on the client's camera track
+
+    Incoming frames are pulled continuously and only the newest one is
+    kept, so when inference falls behind the returned video skips frames
+    instead of drifting further behind the camera. Each annotated frame is
+    sent back on the peer connection and its counters and feedback go out
+    on the 'metrics' data channel when the client opened one.
+
+    The WebRTC loop runs on a native thread, outside the eventlet hub, so
+    the track does its inference on its own native worker with its own
+    pose instance instead of going through the green inference scheduler.
     """
-    # Initialize WebRTC connection and start receiving video
-    try:
-        # Create a PeerConnection
-        pc = RTCPeerConnection()
-        
-        # Add video track to peer connection
-        video_track = VideoStreamTrack(exercise_type)
-        pc.addTrack(video_track)
-
-        # Create and send offer to client
-        offer = await pc.createOffer()
-        await pc.setLocalDescription(offer)
-
-        # Here, send the SDP answer to the client
-
-        # Process frames from the video track
-        while True:
-            frame = await video_track.recv()
-            if frame is not None:
-                # Call your exercise processing code here, e.g., using the frame
-                await process_exercise_frame(frame, exercise_type)
-                
-            await asyncio.sleep(0.1)  # Avoid high CPU usage
-
-    except Exception as e:
-        print(f"Error in video processor: {str(e)}")
-    finally:
-        # Clean up resources
-        print(f"Video processor for {exercise_type} stopped")
-
-async def process_exercise_frame(frame, exercise_type):
+
+    kind = 'video'
+
+    def __init__(self, track, spec, session_id):
+        super().__init__()
+        self.track = track
+        self.session_id = session_id
+        self.tracker = ExerciseTracker(spec)
+        self.channel = None
+        self.result = None
+
+        self._loop = asyncio.get_running_loop()
+        self._jobs = native_queue()
+        self._worker = native_thread(target=self._work, daemon=True, name=f"rtc-{session_id[:8]}")
+        self._worker.start()
+
+        self._latest = None
+        self._fresh = asyncio.Event()
+        self._ended = False
+        self._reader = asyncio.ensure_future(self._read_source())
+
+        self.received = 0
+        self.processed = 0
+
+    async def _read_source(self):
+        """Keep only the newest frame from the client's track"""
+        try:
+            while True:
+                self._latest = await self.track.recv()
+                self.received += 1
+                self._fresh.set()
+        except MediaStreamError:
+            pass
+        finally:
+            self._ended = True
+            self._fresh.set()
+
+    async def recv(self):
+        await self._fresh.wait()
+        if not self._ended:
+            self._fresh.clear()
+        frame, self._latest = self._latest, None
+        if frame is None:
+            # Source ended with nothing left to process
+            self.stop()
+            raise MediaStreamError
+
+        started = time.monotonic()
+        # Inference runs on the track's worker, keep it off the event loop
+        done = self._loop.create_future()
+        self._jobs.put((frame.to_ndarray(format='bgr24'), done))
+        image = await done
+        self.processed += 1
+
+        annotated = VideoFrame.from_ndarray(image, format='bgr24')
+        annotated.pts = frame.pts
+        annotated.time_base = frame.time_base
+        self._send_metrics((time.monotonic() - started) * 1000)
+        return annotated
+
+    def _work(self):
+        pose = create_pose()
+        estimator = AdaptivePoseEstimator(pose)
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                image, done = job
+                try:
+                    outcome = (self._process(estimator, image), None)
+                except Exception as e:
+                    outcome = (None, e)
+                self._loop.call_soon_threadsafe(_resolve, done, *outcome)
+        finally:
+            pose.close()
+
+    def _process(self, estimator, image):
+        if self.tracker.spec.flip:
+            image = cv2.flip(image, 1)
+
+        landmarks = estimator.estimate(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if landmarks is not None:
+            self.result = self.tracker.update(landmarks, image.shape)
+            draw_frame(image, self.tracker, landmarks, self.result)
+        return image
+
+    def _send_metrics(self, processing_ms):
+        if self.channel is None or self.channel.readyState != 'open':
+            return
+        result = self.result
+        self.channel.send(json.dumps({
+            'exercise': result.to_dict() if result else None,
+            'feedback': result.feedback if result else "",
+            'processing_ms': round(processing_ms, 1),
+            'received': self.received,
+            'processed': self.processed
+        }))
+
+    def stop(self):
+        if self.readyState == 'ended':
+            return
+        super().stop()
+        self._reader.cancel()
+        self._jobs.put(None)
+
+
+def _resolve(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+async def process_offer(offer_data, spec):
     """
-    Process the frames for the given exercise type.
-    
+    Answer a client's WebRTC offer with an annotated video track
+
+    The client sends its camera as a video track and may open a 'metrics'
+    data channel; the answer carries the exercise overlay back on the same
+    transceiver. aiortc gathers ICE candidates before answering, so they
+    are all inside the answer SDP.
+
     Args:
-        frame: The video frame
-        exercise_type: Type of exercise being performed
+        offer_data: {'sdp': {'type': 'offer', 'sdp': ...}} from the client
+        spec: ExerciseSpec to run on the incoming video
+
+    Returns:
+        Response dict with the answer SDP and the session id
     """
-    # Process frame here - you can add your frame processing logic
-    print(f"Processing frame for {exercise_type}")
-    # Example: Using OpenCV to process the frame
-    # processed_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    # frame_data = processed_frame
-    return
+    session_id = uuid.uuid4().hex
+    pc = RTCPeerConnection()
+    peer_connections[session_id] = pc
+    exercise_track = None
+    metrics_channel = None
 
-from aiortc import RTCPeerConnection, VideoStreamTrack
+    @pc.on('datachannel')
+    def on_datachannel(channel):
+        nonlocal metrics_channel
+        if channel.label == 'metrics':
+            metrics_channel = channel
+            if exercise_track is not None:
+                exercise_track.channel = channel
+
+    @pc.on('track')
+    def on_track(track):
+        nonlocal exercise_track
+        if track.kind == 'video' and exercise_track is None:
+            exercise_track = ExerciseVideoTrack(track, spec, session_id)
+            exercise_track.channel = metrics_channel
+            pc.addTrack(exercise_track)
+
+    @pc.on('connectionstatechange')
+    async def on_connectionstatechange():
+        print(f"WebRTC session {session_id}: {pc.connectionState}")
+        if pc.connectionState in ('failed', 'closed'):
+            await close_peer(session_id)
 
-async def process_offer(offer_data):
     try:
-        sdp = offer_data.get('sdp', {})
-        exercise = offer_data.get('exercise', 'default')
-        
-        # Create a simplified WebRTC response
-        response = {
-            'sdp': {
-                'type': 'answer',
-                'sdp': sdp.get('sdp', '')
-            },
-            'ice_candidates': []
-        }
-        
-        return response
-    except Exception as e:
-        print(f"Error processing offer: {str(e)}")
-        return {"error": str(e)}
+        offer = offer_data['sdp']
+        await pc.setRemoteDescription(RTCSessionDescription(sdp=offer['sdp'], type=offer['type']))
+        if exercise_track is None:
+            raise ValueError("Offer has no video track")
 
+        await pc.setLocalDescription(await pc.createAnswer())
+    except Exception:
+        await close_peer(session_id)
+        raise
 
+    print(f"WebRTC session {session_id} started")
+    return {
+        'sdp': {
+            'type': pc.localDescription.type,
+            'sdp': pc.localDescription.sdp
+        },
+        'ice_candidates': [],
+        'session_id': session_id
+    }
 
 
-import asyncio
-from aiortc import RTCPeerConnection, VideoStreamTrack
+async def close_peer(session_id):
+    """Close one peer connection and stop its tracks"""
+    pc = peer_connections.pop(session_id, None)
+    if pc is None:
+        return
+    for sender in pc.getSenders():
+        if sender.track is not None:
+            sender.track.stop()
+    await pc.close()
+    print(f"WebRTC session {session_id} closed")
 
-async def process_offer(offer_data):
-    try:
-        sdp = offer_data.get('sdp', {})
-        exercise = offer_data.get('exercise', 'default')
-        
-        # Simplified WebRTC response
-        response = {
-            'sdp': {
-                'type': 'answer',
-                'sdp': sdp.get('sdp', '')
-            },
-            'ice_candidates': []
-        }
-        
-        return response
-    except Exception as e:
-        print(f"Error processing WebRTC offer: {str(e)}")
-        return {"error": str(e)}
-    
-
-
-
-    
-def get_frame_from_exercise(exercise_type):
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_rtc_loop():
     """
-    Get the latest processed frame for a specific exercise
-    
-    Args:
-        exercise_type: Type of exercise
-        
-    Returns:
-        Latest processed frame or None if not available
+    Return the event loop that owns every peer connection, starting it on first use
+
+    aiortc keeps ICE, DTLS and RTP running on the loop a connection was
+    created on, so it has to outlive the request that answered the offer.
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                # A native thread even under eventlet, asyncio cannot share the green hub
+                native_thread(target=loop.run_forever, daemon=True, name="rtc-loop").start()
+                _loop = loop
+    return _loop
+
+
+def run_coroutine(coro, timeout=None):
+    """
+    Run a coroutine on the WebRTC loop from another thread and wait for its result
+
+    The result comes back through a native queue, waited on in the offload
+    pool, so a green caller neither blocks the hub nor shares a green lock
+    with the loop's thread.
     """
-    # In a real implementation, this would retrieve the latest frame
-    # For now it just returns None
-    return None
+    outcome = native_queue()
+
+    async def run():
+        try:
+            outcome.put((await coro, None))
+        except Exception as e:
+            outcome.put((None, e))
+
+    loop = get_rtc_loop()
+    loop.call_soon_threadsafe(loop.create_task, run())
+    try:
+        result, error = offload(outcome.get, timeout=timeout)
+    except queue.Empty:
+        raise TimeoutError(f"WebRTC call did not finish within {timeout}s")
+    if error is not None:
+        raise error
+    return result
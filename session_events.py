@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+from session_store import get_store_client, store_key, store_ttl, wait_for_publish
+
+
+class SessionEventLog:
+    """Recent state-change events of one session plus the state they lead to"""
+
+    def __init__(self, max_events, last_id=0):
+        self.events = deque(maxlen=max_events)   # (id, type, data)
+        self.last_id = last_id
+        self.counters = {}
+        self.stages = {}
+        self.feedback_key = None
+        self.feedback = ""
+
+    def snapshot(self):
+        return {
+            'counters': dict(self.counters),
+            'stages': dict(self.stages),
+            'feedback_key': self.feedback_key,
+            'feedback': self.feedback
+        }
+
+
+def coalesce(events):
+    """
+    Collapse a burst to the last event per (type, name)
+
+    Counts and stages are absolute, so only the newest value of each matters.
+    """
+    latest = {}
+    for event in events:
+        event_id, kind, data = event
+        latest[(kind, data.get('counter') or data.get('stage'))] = event
+    return sorted(latest.values(), key=lambda event: event[0])
+
+
+def changes_since(events, last_id, after, snapshot):
+    """
+    What a reader that has seen up to ``after`` needs next
+
+    Returns:
+        (coalesced events, None, last id), or ([], snapshot, last id) when
+        events after ``after`` have already left the retained log or
+        ``after`` is newer than anything in it
+    """
+    oldest = events[0][0] if events else last_id + 1
+    if after < oldest - 1 or after > last_id:
+        # Missed events have left the log, or the id is from a log that was
+        # closed and opened again; start again from the full state
+        return [], snapshot, last_id
+    return coalesce(event for event in events if event[0] > after), None, last_id
+
+
+class SessionEvents:
+    """
+    State-change feed for Server-Sent Events
+
+    The frame loop hands every FrameResult to ``update``; only changes are
+    logged: 'rep' when a counter moves, 'stage' when a stage flips and
+    'feedback' when the feedback code changes. Readers block in ``read``
+    until events newer than their last id exist, then wait ``coalesce``
+    seconds longer so a burst goes out as one batch. The last
+    ``max_events`` events are kept for clients resuming with Last-Event-ID.
+    """
+
+    def __init__(self, max_events=None, coalesce_window=None):
+        self.max_events = max_events or int(os.environ.get('SSE_EVENT_LOG', 256))
+        self.coalesce_window = (coalesce_window if coalesce_window is not None
+                                else float(os.environ.get('SSE_COALESCE_MS', 100)) / 1000)
+        self._cv = threading.Condition()
+        self._logs = {}
+
+    def open(self, key):
+        with self._cv:
+            previous = self._logs.get(key)
+            # Ids keep increasing when a session restarts under the same key,
+            # so readers already connected see the new session's events
+            self._logs[key] = SessionEventLog(self.max_events, previous.last_id if previous is not None else 0)
+
+    def close(self, key):
+        """Drop a finished session and end its streams"""
+        with self._cv:
+            self._logs.pop(key, None)
+            self._cv.notify_all()
+
+    def _append(self, log, kind, data):
+        log.last_id += 1
+        log.events.append((log.last_id, kind, data))
+
+    def _record(self, log, result):
+        """Log what changed in a result, returns the new events"""
+        before = log.last_id
+        for name, count in result.counters.items():
+            if log.counters.get(name) != count:
+                log.counters[name] = count
+                self._append(log, 'rep', {'counter': name, 'count': count})
+        for name, stage in result.stages.items():
+            if log.stages.get(name) != stage:
+                log.stages[name] = stage
+                self._append(log, 'stage', {'stage': name, 'value': stage})
+        if result.feedback_key != log.feedback_key:
+            log.feedback_key, log.feedback = result.feedback_key, result.feedback
+            self._append(log, 'feedback', {'key': result.feedback_key, 'message': result.feedback})
+        return [event for event in log.events if event[0] > before]
+
+    def update(self, key, result):
+        """
+        Log what changed in a frame's result
+
+        Args:
+            key: Session id
+            result: FrameResult from ExerciseTracker.update
+        """
+        with self._cv:
+            log = self._logs.get(key)
+            if log is None:
+                return
+            if self._record(log, result):
+                self._cv.notify_all()
+
+    def read(self, key, after, timeout):
+        """
+        Wait for events newer than ``after``
+
+        Args:
+            key: Session id
+            after: Last event id the reader has (Last-Event-ID)
+            timeout: Seconds to wait for the first new event
+
+        Returns:
+            None once the session is gone, otherwise a tuple of
+            (coalesced events, snapshot, last id). snapshot is the full
+            state when ``after`` is older than the retained log, else None.
+        """
+        with self._cv:
+            if not self._cv.wait_for(lambda: key not in self._logs or self._logs[key].last_id != after, timeout):
+                return [], None, after
+            if key not in self._logs:
+                return None
+
+            # Let the rest of a burst arrive before sending
+            deadline = time.monotonic() + self.coalesce_window
+            while key in self._logs and time.monotonic() < deadline:
+                self._cv.wait(deadline - time.monotonic())
+            log = self._logs.get(key)
+            if log is None:
+                return None
+            return changes_since(log.events, log.last_id, after, log.snapshot())
+
+    def current(self, key):
+        """(last id, snapshot) for a session, or None if it is not running"""
+        with self._cv:
+            log = self._logs.get(key)
+            return (log.last_id, log.snapshot()) if log is not None else None
+
+
+class RedisSessionEvents(SessionEvents):
+    """
+    SessionEvents whose log lives in Redis
+
+    The process running the session still works out what changed, then
+    pushes the new events and the current state to Redis and notifies the
+    session's channel, so an SSE stream served by any worker can follow it.
+    """
+
+    def __init__(self, client, ttl=None, **kwargs):
+        super().__init__(**kwargs)
+        self._client = client
+        self.ttl = ttl or store_ttl()
+        self._refreshed = {}
+
+    def _keys(self, key):
+        return store_key('events', key), store_key('state', key)
+
+    def _state(self, key):
+        last_id, snapshot = self._client.hmget(self._keys(key)[1], 'last_id', 'snapshot')
+        return (int(last_id), json.loads(snapshot)) if last_id is not None else None
+
+    def open(self, key):
+        super().open(key)
+        stored = self._state(key)
+        with self._cv:
+            log = self._logs[key]
+            if stored is not None:
+                # Carry on from the ids readers on other workers have already seen
+                log.last_id = max(log.last_id, stored[0])
+            last_id = log.last_id
+        events_key, state_key = self._keys(key)
+        pipe = self._client.pipeline()
+        pipe.delete(events_key)
+        pipe.hset(state_key, mapping={'last_id': last_id, 'snapshot': json.dumps(SessionEventLog(0).snapshot())})
+        pipe.expire(state_key, self.ttl)
+        pipe.execute()
+        self._refreshed[key] = time.monotonic()
+
+    def close(self, key):
+        super().close(key)
+        self._refreshed.pop(key, None)
+        events_key, state_key = self._keys(key)
+        pipe = self._client.pipeline()
+        pipe.delete(events_key, state_key)
+        pipe.publish(state_key, '')
+        pipe.execute()
+
+    def update(self, key, result):
+        with self._cv:
+            log = self._logs.get(key)
+            if log is None:
+                return
+            new_events = self._record(log, result)
+            last_id, snapshot = log.last_id, log.snapshot()
+
+        events_key, state_key = self._keys(key)
+        now = time.monotonic()
+        if not new_events:
+            # Keep a quiet session's state from expiring, a few times per ttl
+            if now - self._refreshed.get(key, 0) >= self.ttl / 3:
+                self._client.expire(state_key, self.ttl)
+                self._refreshed[key] = now
+            return
+        pipe = self._client.pipeline()
+        pipe.rpush(events_key, *(json.dumps(event) for event in new_events))
+        pipe.ltrim(events_key, -self.max_events, -1)
+        pipe.expire(events_key, self.ttl)
+        pipe.hset(state_key, mapping={'last_id': last_id, 'snapshot': json.dumps(snapshot)})
+        pipe.expire(state_key, self.ttl)
+        pipe.publish(state_key, '')
+        pipe.execute()
+        self._refreshed[key] = now
+
+    def read(self, key, after, timeout):
+        events_key, state_key = self._keys(key)
+
+        def newer():
+            last_id = self._client.hget(state_key, 'last_id')
+            return last_id is None or int(last_id) != after
+
+        if not wait_for_publish(self._client, state_key, newer, timeout):
+            return [], None, after
+        if not self._client.exists(state_key):
+            return None
+
+        # Let the rest of a burst arrive before sending
+        time.sleep(self.coalesce_window)
+        pipe = self._client.pipeline()
+        pipe.lrange(events_key, 0, -1)
+        pipe.hmget(state_key, 'last_id', 'snapshot')
+        raw_events, (last_id, snapshot) = pipe.execute()
+        if last_id is None:
+            return None
+        events = [tuple(json.loads(event)) for event in raw_events]
+        return changes_since(events, int(last_id), after, json.loads(snapshot))
+
+    def current(self, key):
+        return self._state(key)
+
+
+_events = None
+_events_lock = threading.Lock()
+
+
+def get_session_events():
+    """Return the session event feed, in Redis when a store is configured, creating it on first use"""
+    global _events
+    if _events is None:
+        with _events_lock:
+            if _events is None:
+                client = get_store_client()
+                _events = RedisSessionEvents(client) if client is not None else SessionEvents()
+    return _events
@@ -0,0 +1,228 @@
+"""
+Session state shared between server processes
+
+With one worker process everything lives in memory. Once SESSION_STORE_URL
+(or a Redis SOCKETIO_MESSAGE_QUEUE) is set, the session registry, the
+long-poll result cache and the SSE event log are kept in Redis, so any
+gunicorn worker or instance can answer for a session that another one is
+running. Live objects (cameras, stop events, controllers) never leave the
+process that owns the session.
+"""
+import os
+import json
+import time
+import socket
+import threading
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+KEY_PREFIX = os.environ.get('SESSION_STORE_PREFIX', 'fitness:')
+
+
+def worker_id():
+    """Name of this server process in the shared registry"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def worker_count():
+    """Gunicorn worker processes per instance (WEB_CONCURRENCY, which gunicorn also reads)"""
+    return max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+
+
+def store_url():
+    """
+    Where shared session state lives
+
+    Returns:
+        SESSION_STORE_URL if set, else SOCKETIO_MESSAGE_QUEUE when it is a
+        Redis URL, else None for process-local state
+    """
+    url = os.environ.get('SESSION_STORE_URL')
+    if url:
+        return url
+    message_queue = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+    return message_queue if message_queue.startswith(('redis://', 'rediss://', 'unix://')) else None
+
+
+def store_key(*parts):
+    return KEY_PREFIX + ':'.join(parts)
+
+
+def store_ttl():
+    """Seconds a shared entry survives without being refreshed (a crashed worker's sessions expire)"""
+    return int(os.environ.get('SESSION_STORE_TTL', 60))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_store_client():
+    """Return the shared Redis client, or None when state is process-local"""
+    global _client
+    url = store_url()
+    if url is None:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if redis is None:
+                    raise RuntimeError("SESSION_STORE_URL is set but the redis package is not installed")
+                _client = redis.Redis.from_url(url)
+    return _client
+
+
+def wait_for_publish(client, channel, predicate, timeout):
+    """
+    Block until ``predicate`` holds, re-checking whenever ``channel`` is published to
+
+    The subscription is made before the first check, so a publish between
+    the check and the wait cannot be missed.
+
+    Returns:
+        True if the predicate holds, False on timeout
+    """
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(channel)
+    try:
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            pubsub.get_message(timeout=remaining)
+        return True
+    finally:
+        pubsub.close()
+
+
+class SessionRegistry:
+    """
+    Who runs which session, for a single server process
+
+    Records hold only plain data: exercise, source, mode, transport, the
+    owning worker and the current counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def add(self, session_id, **info):
+        with self._lock:
+            self._sessions[session_id] = dict(info, worker=worker_id(), started_at=time.time())
+
+    def update(self, session_id, **fields):
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id].update(fields)
+
+    def touch(self, session_id):
+        """Keep a running session's record alive (no-op in memory)"""
+
+    def get(self, session_id):
+        with self._lock:
+            record = self._sessions.get(session_id)
+            return dict(record) if record is not None else None
+
+    def remove(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def sessions(self):
+        """All known sessions, session id -> record"""
+        with self._lock:
+            return {session_id: dict(record) for session_id, record in self._sessions.items()}
+
+
+class RedisSessionRegistry(SessionRegistry):
+    """
+    Sessions of every worker and instance, kept in Redis
+
+    Each record is a hash that expires ``ttl`` seconds after its last
+    refresh, so sessions of a worker that died without cleaning up drop out
+    on their own.
+    """
+
+    def __init__(self, client, ttl=None):
+        super().__init__()
+        self._client = client
+        self.ttl = ttl or store_ttl()
+        self._index = store_key('sessions')
+        self._refreshed = {}
+
+    def _key(self, session_id):
+        return store_key('session', session_id)
+
+    def add(self, session_id, **info):
+        record = dict(info, worker=worker_id(), started_at=time.time())
+        name = self._key(session_id)
+        pipe = self._client.pipeline()
+        pipe.delete(name)
+        pipe.hset(name, mapping={field: json.dumps(value) for field, value in record.items()})
+        pipe.expire(name, self.ttl)
+        pipe.sadd(self._index, session_id)
+        pipe.execute()
+        self._refreshed[session_id] = time.monotonic()
+
+    def update(self, session_id, **fields):
+        name = self._key(session_id)
+        pipe = self._client.pipeline()
+        pipe.hset(name, mapping={field: json.dumps(value) for field, value in fields.items()})
+        pipe.expire(name, self.ttl)
+        pipe.execute()
+        self._refreshed[session_id] = time.monotonic()
+
+    def touch(self, session_id):
+        # Called every frame, only goes to Redis a few times per ttl
+        now = time.monotonic()
+        if now - self._refreshed.get(session_id, 0) >= self.ttl / 3:
+            self._client.expire(self._key(session_id), self.ttl)
+            self._refreshed[session_id] = now
+
+    def get(self, session_id):
+        record = self._client.hgetall(self._key(session_id))
+        if not record:
+            return None
+        return {field.decode(): json.loads(value) for field, value in record.items()}
+
+    def remove(self, session_id):
+        pipe = self._client.pipeline()
+        pipe.delete(self._key(session_id))
+        pipe.srem(self._index, session_id)
+        pipe.execute()
+        self._refreshed.pop(session_id, None)
+
+    def sessions(self):
+        session_ids = [session_id.decode() for session_id in self._client.smembers(self._index)]
+        pipe = self._client.pipeline()
+        for session_id in session_ids:
+            pipe.hgetall(self._key(session_id))
+        sessions = {}
+        expired = []
+        for session_id, record in zip(session_ids, pipe.execute()):
+            if record:
+                sessions[session_id] = {field.decode(): json.loads(value) for field, value in record.items()}
+            else:
+                expired.append(session_id)
+        if expired:
+            self._client.srem(self._index, *expired)
+        return sessions
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_session_registry():
+    """Return the session registry, in Redis when a store is configured, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                client = get_store_client()
+                _registry = RedisSessionRegistry(client) if client is not None else SessionRegistry()
+    return _registry
@@ -0,0 +1,200 @@
+import os
+import math
+import time
+import threading
+
+from pose_pool import default_pool_size, worker_cpus
+from pose_workers import pose_worker_processes
+
+# Lifecycle of a session run by this process
+STARTING = 'starting'   # admitted, frame loop not running yet
+RUNNING = 'running'     # frame loop is processing frames
+DRAINING = 'draining'   # stop requested, frame loop finishing its last frame
+STOPPED = 'stopped'     # frame loop exited, removed from the table
+
+
+class SessionLimitReached(RuntimeError):
+    """Raised when admitting a session would exceed the process's capacity"""
+
+    reason = 'capacity'
+
+
+class Session:
+    """
+    One exercise session run by this process
+
+    Keeps the session's live objects (stop event, frame source, quality
+    controller, pacer, estimator) next to its plain state. The fields are
+    fixed by __slots__, so a misspelt field fails loudly instead of quietly
+    adding a key, and each session stays small.
+    """
+
+    __slots__ = ('session_id', 'exercise_id', 'source', 'mode', 'transport', 'state', 'stop_event',
+                 'cap', 'quality', 'output', 'pacer', 'estimator', 'left_counter', 'right_counter', 'started_at')
+
+    def __init__(self, session_id, exercise_id, source='server', mode='video', transport='socket.io',
+                 cap=None, quality=None, output=None):
+        self.session_id = session_id
+        self.exercise_id = exercise_id
+        self.source = source
+        # 'video' rendered frames, 'landmarks' pose data only, 'counters' cached results only (long-poll)
+        self.mode = mode
+        self.transport = transport
+        self.state = STARTING
+        self.stop_event = threading.Event()
+        self.cap = cap
+        self.quality = quality
+        # Fixed {'scale', 'quality', 'fps'} for sessions started under load without a quality controller
+        self.output = output
+        self.pacer = None
+        self.estimator = None
+        self.left_counter = 0
+        self.right_counter = 0
+        self.started_at = time.time()
+
+    def release(self):
+        """Stop the frame loop and free the camera or upload source"""
+        self.stop_event.set()
+        if self.cap is not None:
+            self.cap.release()
+
+
+def default_capacity():
+    """
+    Work out how many sessions this process may run at once
+
+    MAX_SESSIONS wins if set, otherwise SESSIONS_PER_CPU (default 2)
+    sessions for every CPU core this worker process gets. With the
+    in-process pose pool that is capped at the pool size: every session
+    holds a pose instance until it ends, so a session admitted past the
+    pool would only wait for an instance and fail.
+    """
+    if os.environ.get('MAX_SESSIONS'):
+        return max(1, int(os.environ['MAX_SESSIONS']))
+
+    per_cpu = float(os.environ.get('SESSIONS_PER_CPU', 2))
+    capacity = max(1, math.ceil(worker_cpus() * per_cpu))
+    if not pose_worker_processes():
+        capacity = min(capacity, default_pool_size())
+    return capacity
+
+
+class SessionTable:
+    """
+    Thread-safe table of the sessions this process runs, with admission control
+
+    A new session is admitted only while fewer than ``capacity`` sessions
+    are running, so past that point new clients are turned away instead of
+    every session's frame rate dropping. Restarting an exercise under the
+    same session id replaces the old session and does not count twice.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or default_capacity()
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self.admitted = 0
+        self.refused = 0
+
+    def admit(self, session, others=0):
+        """
+        Register a session if there is room for it
+
+        Args:
+            session: New Session in the STARTING state
+            others: Sessions this process runs outside the table (WebRTC peers, MJPEG producers)
+
+        Returns:
+            The session it replaces, already stopped, or None
+
+        Raises:
+            SessionLimitReached: If the process is at capacity
+        """
+        with self._lock:
+            previous = self._sessions.get(session.session_id)
+            active = len(self._sessions) - (previous is not None) + others
+            if active >= self.capacity:
+                self.refused += 1
+                raise SessionLimitReached(f"Server is at capacity ({self.capacity} sessions)")
+            if previous is not None:
+                previous.state = DRAINING
+                previous.release()
+            self._sessions[session.session_id] = session
+            self.admitted += 1
+            return previous
+
+    def has_room(self, others=0):
+        """Whether one more session would be admitted (counts refusals like admit)"""
+        with self._lock:
+            if len(self._sessions) + others < self.capacity:
+                return True
+            self.refused += 1
+            return False
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def start(self, session):
+        """
+        Move a session to RUNNING as its frame loop begins
+
+        Returns:
+            False if the session was stopped before its loop got to run
+        """
+        with self._lock:
+            if session.state != STARTING:
+                return False
+            session.state = RUNNING
+            return True
+
+    def stop(self, session_id):
+        """Ask a session's frame loop to finish; the session stays listed until it has"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            session.state = DRAINING
+        session.release()
+        return session
+
+    def finish(self, session):
+        """
+        Remove a session once its frame loop has exited
+
+        Returns:
+            True if the session still owned its id (it was not replaced by a restart)
+        """
+        with self._lock:
+            session.state = STOPPED
+            if self._sessions.get(session.session_id) is session:
+                del self._sessions[session.session_id]
+                return True
+            return False
+
+    def sessions(self):
+        """Snapshot of the current sessions"""
+        with self._lock:
+            return list(self._sessions.values())
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        """Return occupancy and admission counters for diagnostics"""
+        with self._lock:
+            states = {}
+            for session in self._sessions.values():
+                states[session.state] = states.get(session.state, 0) + 1
+            return {
+                'sessions': len(self._sessions),
+                'capacity': self.capacity,
+                'states': states,
+                'admitted': self.admitted,
+                'refused': self.refused
+            }
@@ -0,0 +1,78 @@
+/**
+ * Decoder for the binary landmark packets produced by landmark_codec.py
+ *
+ * Header: uint8 version, uint8 kind, uint16 seq, uint8 count (little-endian).
+ * Keyframes carry every landmark, delta frames a bitmask followed by only
+ * the landmarks that moved; each entry is int16 x, y, z and uint8 visibility.
+ */
+class LandmarkDecoder {
+    static VERSION = 1;
+    static KEY = 1;
+    static DELTA = 2;
+    static EMPTY = 3;
+    static HEADER_SIZE = 5;
+    static ENTRY_SIZE = 7;
+    static COORD_SCALE = 16384;
+    static VISIBILITY_SCALE = 255;
+
+    constructor() {
+        this.state = null;
+        this.seq = null;
+    }
+
+    readEntry(view, offset) {
+        return [
+            view.getInt16(offset, true) / LandmarkDecoder.COORD_SCALE,
+            view.getInt16(offset + 2, true) / LandmarkDecoder.COORD_SCALE,
+            view.getInt16(offset + 4, true) / LandmarkDecoder.COORD_SCALE,
+            view.getUint8(offset + 6) / LandmarkDecoder.VISIBILITY_SCALE
+        ];
+    }
+
+    /**
+     * Decode one packet
+     * @param {ArrayBuffer} buffer - Packet received with exercise_landmarks
+     * @returns {Array|null} count x [x, y, z, visibility], or null for an empty or undecodable frame
+     */
+    decode(buffer) {
+        const view = new DataView(buffer);
+        const version = view.getUint8(0);
+        const kind = view.getUint8(1);
+        const seq = view.getUint16(2, true);
+        const count = view.getUint8(4);
+
+        if (version !== LandmarkDecoder.VERSION) {
+            throw new Error(`Unsupported landmark packet version ${version}`);
+        }
+
+        const inSequence = this.seq !== null && seq === ((this.seq + 1) & 0xFFFF);
+        this.seq = seq;
+
+        let offset = LandmarkDecoder.HEADER_SIZE;
+        if (kind === LandmarkDecoder.KEY) {
+            this.state = [];
+            for (let i = 0; i < count; i++, offset += LandmarkDecoder.ENTRY_SIZE) {
+                this.state.push(this.readEntry(view, offset));
+            }
+        } else if (kind === LandmarkDecoder.DELTA) {
+            if (!inSequence || !this.state || this.state.length !== count) {
+                // Missed the base frame, wait for the next keyframe
+                this.state = null;
+                return null;
+            }
+            const maskOffset = offset;
+            offset += Math.ceil(count / 8);
+            for (let i = 0; i < count; i++) {
+                if (view.getUint8(maskOffset + (i >> 3)) & (1 << (i & 7))) {
+                    this.state[i] = this.readEntry(view, offset);
+                    offset += LandmarkDecoder.ENTRY_SIZE;
+                }
+            }
+        } else {
+            this.state = null;
+            return null;
+        }
+
+        return this.state;
+    }
+}
@@ -0,0 +1,95 @@
+/**
+ * Client-side exercise overlay for landmark-only sessions
+ *
+ * The server sends a render plan once (from exercise_started) and then only
+ * landmarks, angles, counters and feedback per frame; this draws the same
+ * skeleton and angle labels the server would have burned into the video,
+ * on a canvas laid over the local camera preview.
+ */
+class LandmarkOverlay {
+    /**
+     * @param {HTMLCanvasElement} canvas - Canvas positioned over the preview
+     * @param {Object} plan - render_plan from the exercise_started event
+     */
+    constructor(canvas, plan) {
+        this.canvas = canvas;
+        this.ctx = canvas.getContext('2d');
+        this.plan = plan;
+    }
+
+    /**
+     * Rebuild the extended point array: landmarks followed by derived points
+     * @param {Array} landmarks - 33 x [x, y, z, visibility] normalized landmarks
+     * @returns {Array} [x, y] points in canvas pixels
+     */
+    points(landmarks) {
+        const points = landmarks.map(lm => [lm[0], lm[1]]);
+        for (const [index, a, b] of this.plan.mids) {
+            points[index] = [(points[a][0] + points[b][0]) / 2, (points[a][1] + points[b][1]) / 2];
+        }
+        for (const [index, source, distance] of this.plan.aboves) {
+            points[index] = [points[source][0], points[source][1] - distance];
+        }
+
+        const width = this.canvas.width;
+        const height = this.canvas.height;
+        return points.map(([x, y]) => [x * width, y * height]);
+    }
+
+    clear() {
+        this.ctx.clearRect(0, 0, this.canvas.width, this.canvas.height);
+    }
+
+    line(a, b, color) {
+        this.ctx.strokeStyle = color;
+        this.ctx.lineWidth = 2;
+        this.ctx.beginPath();
+        this.ctx.moveTo(a[0], a[1]);
+        this.ctx.lineTo(b[0], b[1]);
+        this.ctx.stroke();
+    }
+
+    /**
+     * Draw one frame's overlay
+     * @param {Array|null} landmarks - Landmark array, or null when nobody is tracked
+     * @param {Object|null} exercise - Engine result (angles, sides, highlighted)
+     */
+    draw(landmarks, exercise) {
+        this.clear();
+        if (!landmarks || !exercise) {
+            return;
+        }
+
+        const ctx = this.ctx;
+        const points = this.points(landmarks);
+        const highlighted = new Set(exercise.highlighted || []);
+
+        for (const [a, b] of this.plan.cross_segments) {
+            this.line(points[a], points[b], 'rgb(255, 255, 0)');
+        }
+
+        for (const side of exercise.sides) {
+            for (const [a, b] of this.plan.segments[side] || []) {
+                this.line(points[a], points[b], 'rgb(0, 255, 0)');
+            }
+
+            ctx.fillStyle = 'rgb(255, 0, 0)';
+            for (const index of this.plan.joints[side] || []) {
+                ctx.beginPath();
+                ctx.arc(points[index][0], points[index][1], 7, 0, 2 * Math.PI);
+                ctx.fill();
+            }
+
+            ctx.font = 'bold 14px sans-serif';
+            for (const label of this.plan.labels[side] || []) {
+                const value = exercise.angles[label.measure];
+                if (value === undefined) {
+                    continue;
+                }
+                const [x, y] = points[label.anchor];
+                ctx.fillStyle = highlighted.has(label.measure) ? 'rgb(255, 0, 0)' : 'rgb(255, 255, 255)';
+                ctx.fillText(label.format.replace('{}', Math.trunc(value)), x + label.offset[0], y + label.offset[1]);
+            }
+        }
+    }
+}
@@ -11,6 +11,8 @@ class WebRTCHandler {
         this.localStream = null;
         this.currentExercise = null;
         this.currentCameraId = null; // تخزين معرف الكاميرا الحالية
+        this.metricsChannel = null;
+        this.metrics = null; // آخر مقاييس التمرين من الخادم
         
         // معرفة نوع الجهاز
         this.isMobile = /Android|webOS|iPhone|iPad|iPod|BlackBerry|IEMobile|Opera Mini/i.test(navigator.userAgent);
@@ -41,18 +43,7 @@ class WebRTCHandler {
         this.showLoading();
         
         try {
-            // محاولة استخدام الطريقة التقليدية أولاً كخطة بديلة
-            if (!this.isMobile) {
-                try {
-                    console.log('WebRTC: محاولة استخدام الطريقة التقليدية');
-                    this.showLegacyStream(exerciseId);
-                    console.log('WebRTC: نجح استخدام الطريقة التقليدية');
-                    return; // الخروج إذا نجحت الطريقة التقليدية
-                } catch (legacyError) {
-                    console.warn("الطريقة التقليدية غير متاحة، جاري تجربة WebRTC", legacyError);
-                }
-            }
-            
+            // الخادم يعالج الفيديو عبر WebRTC، والبث التقليدي خطة بديلة فقط
             // الحصول على تدفق الكاميرا
             try {
                 console.log('محاولة الوصول إلى الكاميرا...');
@@ -101,6 +92,13 @@ class WebRTCHandler {
             });
             console.log('تمت إضافة المسارات المحلية إلى اتصال النظير');
             
+            // قناة بيانات يرسل عليها الخادم العدادات والتغذية الراجعة لكل إطار
+            this.metricsChannel = this.peerConnection.createDataChannel('metrics');
+            this.metricsChannel.onmessage = (event) => {
+                this.metrics = JSON.parse(event.data);
+                window.dispatchEvent(new CustomEvent('exercise-metrics', { detail: this.metrics }));
+            };
+            
             // إعداد معالجة مرشح ICE
             this.peerConnection.onicecandidate = (event) => {
                 if (event.candidate) {
@@ -295,6 +293,11 @@ class WebRTCHandler {
     resetConnection() {
         console.log('إعادة ضبط اتصال WebRTC');
         
+        if (this.metricsChannel) {
+            this.metricsChannel.close();
+            this.metricsChannel = null;
+        }
+        
         if (this.peerConnection) {
             this.peerConnection.close();
             this.peerConnection = null;
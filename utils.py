@@ -7,40 +7,114 @@ import os
 mp_drawing = mp.solutions.drawing_utils
 mp_pose = mp.solutions.pose
 
-# Create pose instance with reasonable defaults for cloud environment
-# Note: We're using lower confidence thresholds to ensure better performance in cloud
-pose = mp_pose.Pose(
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5,
-    model_complexity=1  # Medium complexity for balance between performance and accuracy
-)
+# Integer landmark indices so exercises can index the landmark array directly
+NUM_LANDMARKS = len(mp_pose.PoseLandmark)
+LANDMARK = {landmark.name.lower(): landmark.value for landmark in mp_pose.PoseLandmark}
+SIDE_JOINTS = {
+    side: {
+        joint: LANDMARK[f'{side}_{joint}']
+        for joint in ('shoulder', 'elbow', 'wrist', 'hip', 'knee', 'ankle')
+    }
+    for side in ('left', 'right')
+}
+
+def create_pose():
+    """
+    Create a pose instance with reasonable defaults for cloud environment
+
+    Note: We're using lower confidence thresholds to ensure better performance in cloud.
+    Sessions should check instances out of the shared pool in pose_pool.py rather
+    than calling this directly.
+
+    Returns:
+        New mediapipe Pose instance
+    """
+    return mp_pose.Pose(
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+        model_complexity=1  # Medium complexity for balance between performance and accuracy
+    )
 
 def calculate_angle(a, b, c):
     """
     Calculate the angle between three points
     
     Args:
-        a: First point [x, y]
-        b: Mid point [x, y]
-        c: End point [x, y]
+        a: First point [x, y] or [x, y, z]
+        b: Mid point [x, y] or [x, y, z]
+        c: End point [x, y] or [x, y, z]
         
     Returns:
-        Angle in degrees
+        Angle in degrees (0 if either limb has zero length)
     """
-    a = np.array(a)  # First
-    b = np.array(b)  # Mid
-    c = np.array(c)  # End
+    abx, aby = a[0] - b[0], a[1] - b[1]
+    cbx, cby = c[0] - b[0], c[1] - b[1]
+    dot = abx * cbx + aby * cby
 
-    ab = a - b
-    bc = c - b
+    if len(a) > 2:
+        abz, cbz = a[2] - b[2], c[2] - b[2]
+        dot += abz * cbz
+        cross = math.sqrt((aby * cbz - abz * cby) ** 2 +
+                          (abz * cbx - abx * cbz) ** 2 +
+                          (abx * cby - aby * cbx) ** 2)
+    else:
+        cross = abs(abx * cby - aby * cbx)
 
-    # Calculate the angle using dot product
-    # Use clip to handle floating point errors
-    cosine_angle = np.clip(np.dot(ab, bc) / (np.linalg.norm(ab) * np.linalg.norm(bc)), -1.0, 1.0)
-    angle = np.arccos(cosine_angle)
+    # atan2 of |cross| and dot needs no normalisation and is 0 for degenerate limbs
+    return math.degrees(math.atan2(cross, dot))
+
+def calculate_angles(triplets):
+    """
+    Calculate many joint angles in a single vectorized call
     
-    # Convert to degrees
-    return math.degrees(angle)
+    Args:
+        triplets: Array-like of shape (N, 3, 2) or (N, 3, 3) holding
+            [first, mid, end] points for every angle
+        
+    Returns:
+        NumPy array of N angles in degrees (0 where a limb has zero length)
+    """
+    triplets = np.asarray(triplets, dtype=np.float64)
+
+    ab = triplets[:, 0] - triplets[:, 1]
+    cb = triplets[:, 2] - triplets[:, 1]
+    dot = np.einsum('ij,ij->i', ab, cb)
+
+    if triplets.shape[2] == 2:
+        cross = np.abs(ab[:, 0] * cb[:, 1] - ab[:, 1] * cb[:, 0])
+    else:
+        cross = np.linalg.norm(np.cross(ab, cb), axis=1)
+
+    return np.degrees(np.arctan2(cross, dot))
+
+def landmarks_to_array(pose_landmarks):
+    """
+    Convert mediapipe pose landmarks into a single array
+    
+    Args:
+        pose_landmarks: results.pose_landmarks from mediapipe
+        
+    Returns:
+        float32 array of shape (33, 4) holding x, y, z, visibility per landmark
+    """
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark],
+        dtype=np.float32
+    )
+
+def to_pixels(landmarks, image_shape):
+    """
+    Project normalized landmarks onto the image in one vectorized multiply
+    
+    Args:
+        landmarks: Array of shape (N, 2+) with normalized x, y in the first two columns
+        image_shape: Shape of the image the landmarks belong to
+        
+    Returns:
+        List of (x, y) integer pixel tuples ready for OpenCV drawing calls
+    """
+    scale = np.array([image_shape[1], image_shape[0]], dtype=np.float32)
+    return list(map(tuple, (landmarks[:, :2] * scale).astype(np.int32).tolist()))
 
 def ensure_directories():
     """